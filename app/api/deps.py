@@ -1,5 +1,5 @@
-from typing import Generator
-from app.db.session import SessionLocal
+from typing import AsyncGenerator, Generator
+from app.db.session import SessionLocal, AsyncSessionLocal
 
 def get_db() -> Generator:
     try:
@@ -7,3 +7,7 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,81 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Keyset (cursor) pagination over (timestamp DESC, id DESC).
+# The cursor of the next page is returned in this response header.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Page size when a cursor is given without a limit
+DEFAULT_PAGE_SIZE = 100
+
+
+def encode_cursor(ts: datetime, row_id: uuid.UUID) -> str:
+    raw = f"{ts.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts), uuid.UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_size(cursor: Optional[str], limit: Optional[int]) -> Optional[int]:
+    """
+    Rows per page, or None for the whole list. Endpoints that returned every
+    row before pagination (references, avatars, motions) default limit to None
+    so clients sending neither a cursor nor a limit still get all of them;
+    the rest default to DEFAULT_PAGE_SIZE.
+    """
+    if limit is None and cursor:
+        return DEFAULT_PAGE_SIZE
+    return limit
+
+
+def page_statement(query, sort_col, id_col, cursor: Optional[str], limit: Optional[int]):
+    """
+    Restrict a Query or select() to the page after `cursor`, fetching one
+    extra row to detect whether another page follows.
+    """
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        query = query.where(tuple_(sort_col, id_col) < tuple_(ts, row_id))
+    query = query.order_by(sort_col.desc(), id_col.desc())
+    return query.limit(limit + 1) if limit is not None else query
+
+
+def finish_page(rows, sort_col, limit: Optional[int], response: Response):
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_col.key), last.id)
+    return rows
+
+
+def keyset_paginate(query, sort_col, id_col, cursor: Optional[str], limit: Optional[int], response: Response):
+    """
+    Apply keyset pagination to `query` and return one page of rows.
+    Backed by a (sort_col, id) index whose predicate matches the query's
+    filter (partial on status), so a page is a range scan of that index.
+    sort_col must be NOT NULL, NULLs would break both ordering and cursors.
+    """
+    limit = page_size(cursor, limit)
+    rows = page_statement(query, sort_col, id_col, cursor, limit).all()
+    return finish_page(rows, sort_col, limit, response)
+
+
+async def keyset_paginate_async(db, stmt, sort_col, id_col, cursor: Optional[str], limit: Optional[int], response: Response, scalars: bool = True):
+    """
+    keyset_paginate for a select() statement run on an AsyncSession.
+    Pass scalars=False when selecting columns rather than one entity.
+    """
+    limit = page_size(cursor, limit)
+    result = await db.execute(page_statement(stmt, sort_col, id_col, cursor, limit))
+    rows = result.scalars().all() if scalars else result.all()
+    return finish_page(list(rows), sort_col, limit, response)
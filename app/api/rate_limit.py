@@ -0,0 +1,61 @@
+import logging
+import time
+import uuid
+from fastapi import HTTPException, Request
+
+from app.core.config import settings
+from app.services.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Sliding window log: one sorted-set entry per request, scored by time (ms).
+# Trimming, counting and inserting happen atomically inside Redis.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+if redis.call('ZCARD', key) >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    return tonumber(oldest[2]) + window - now
+end
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return 0
+"""
+
+_sliding_window = redis_client.register_script(SLIDING_WINDOW_LUA)
+
+
+class RateLimiter:
+    """
+    Per-client-IP rate limit dependency shared across all API workers through Redis.
+    Usage: `dependencies=[Depends(RateLimiter("uploads", settings.RATE_LIMIT_UPLOADS))]`
+    """
+
+    def __init__(self, scope: str, limit: int, window_seconds: int = settings.RATE_LIMIT_WINDOW_SECONDS):
+        self.scope = scope
+        self.limit = limit
+        self.window_ms = window_seconds * 1000
+
+    def __call__(self, request: Request):
+        if not settings.RATE_LIMIT_ENABLED or self.limit <= 0:
+            return
+
+        client_ip = request.client.host if request.client else "unknown"
+        key = f"ratelimit:{self.scope}:{client_ip}"
+        now_ms = int(time.time() * 1000)
+        try:
+            retry_after_ms = _sliding_window(keys=[key], args=[now_ms, self.window_ms, self.limit, f"{now_ms}-{uuid.uuid4().hex}"])
+        except Exception as e:
+            # Fail open: a Redis outage should not take uploads down with it
+            logger.warning(f"Rate limiter unavailable: {e}")
+            return
+
+        if retry_after_ms > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, -(-int(retry_after_ms) // 1000)))}
+            )
@@ -0,0 +1,148 @@
+"""
+Bulk response assembly for list endpoints.
+
+Lists select only the columns a response needs (plain rows: no identity map,
+no lazy relationship loads) and turn a page into dicts in one pass, with each
+bucket's URL prefix computed once per request. FastAPI validates the returned
+dicts once against the endpoint's response_model, instead of a Pydantic model
+being built per row and then validated a second time on the way out.
+
+The *_dict helpers also accept ORM instances, so single-item endpoints share
+the same response shape.
+"""
+from typing import Iterable, List
+from fastapi import Request
+
+from app.core.config import settings
+from app.api.urls import UrlBuilder, file_url_builder
+from app.models.avatar import Avatar
+from app.models.edit import Edit
+from app.models.motion_cache import MotionCache
+from app.models.track import Track
+from app.models.video import Video
+
+
+# Edits, with the track name and the source motion's thumbnail joined in, so
+# lists never touch Edit.track / Edit.motion (motions have no name of their own)
+EDIT_COLUMNS = (
+    Edit.id,
+    Edit.motion_id,
+    Edit.video_id,
+    Edit.track_id,
+    Edit.status,
+    Edit.processed_file_path,
+    Edit.thumbnail_path,
+    Edit.thumbnail_detail_path,
+    Edit.sprite_path,
+    Edit.created_at,
+    Track.name.label("track_name"),
+    Track.artist.label("track_artist"),
+    MotionCache.motion_thumbnail_url.label("motion_thumbnail_url"),
+)
+
+
+def select_edits(query):
+    """Join the track and motion columns of EDIT_COLUMNS onto a Query/select() of EDIT_COLUMNS."""
+    return query.join(Track, Track.id == Edit.track_id).outerjoin(MotionCache, MotionCache.id == Edit.motion_id)
+
+
+def edit_dict(url: UrlBuilder, e) -> dict:
+    return {
+        "id": e.id,
+        "motion_id": e.motion_id,
+        "video_id": e.video_id,
+        "track_id": e.track_id,
+        "status": e.status.value if hasattr(e.status, "value") else e.status,
+        "track_name": getattr(e, "track_name", None),
+        "track_artist": getattr(e, "track_artist", None),
+        "motion_thumbnail_url": getattr(e, "motion_thumbnail_url", None),
+        "file_url": url(e.processed_file_path),
+        "thumbnail_url": url(e.thumbnail_path),
+        "thumbnail_detail_url": url(e.thumbnail_detail_path),
+        "sprite_url": url(e.sprite_path),
+    }
+
+
+def edit_dicts(request: Request, rows: Iterable) -> List[dict]:
+    url = file_url_builder(request, settings.MINIO_BUCKET_PROCESSED)
+    return [edit_dict(url, e) for e in rows]
+
+
+VIDEO_COLUMNS = (
+    Video.id,
+    Video.original_url,
+    Video.status,
+    Video.file_path,
+    Video.thumbnail_path,
+    Video.thumbnail_detail_path,
+    Video.sprite_path,
+    Video.created_at,
+)
+
+
+def video_dict(url: UrlBuilder, v) -> dict:
+    return {
+        "id": v.id,
+        "original_url": v.original_url,
+        "status": v.status,
+        "file_url": url(v.file_path),
+        "thumbnail_url": url(v.thumbnail_path),
+        "thumbnail_detail_url": url(v.thumbnail_detail_path),
+        "sprite_url": url(v.sprite_path),
+    }
+
+
+def video_dicts(request: Request, rows: Iterable) -> List[dict]:
+    url = file_url_builder(request, settings.MINIO_BUCKET_TIKTOK)
+    return [video_dict(url, v) for v in rows]
+
+
+AVATAR_COLUMNS = (
+    Avatar.id,
+    Avatar.filename,
+    Avatar.source_type,
+    Avatar.created_at,
+)
+
+
+def avatar_dict(url: UrlBuilder, a) -> dict:
+    return {
+        "id": a.id,
+        "filename": a.filename,
+        "source_type": a.source_type,
+        "created_at": a.created_at,
+        "image_url": url(a.filename),
+    }
+
+
+def avatar_dicts(request: Request, rows: Iterable) -> List[dict]:
+    url = file_url_builder(request, settings.MINIO_BUCKET_AVATARS)
+    return [avatar_dict(url, a) for a in rows]
+
+
+# Leaves out the deferred waveform_peaks and the probe columns
+TRACK_COLUMNS = (
+    Track.id,
+    Track.name,
+    Track.artist,
+    Track.duration_seconds,
+    Track.file_path,
+    Track.size_bytes,
+    Track.uploaded_at,
+)
+
+
+def track_dict(url: UrlBuilder, t) -> dict:
+    return {
+        "id": t.id,
+        "name": t.name,
+        "artist": t.artist or "",
+        "duration_seconds": t.duration_seconds,
+        "file_url": url(t.file_path),
+        "size_mb": t.size_bytes / (1024 * 1024),
+    }
+
+
+def track_dicts(request: Request, rows: Iterable) -> List[dict]:
+    url = file_url_builder(request, settings.MINIO_BUCKET_AUDIO)
+    return [track_dict(url, t) for t in rows]
@@ -0,0 +1,28 @@
+from typing import Callable, Optional
+from fastapi import Request
+from app.core.config import settings
+
+# URLs of the /files streaming endpoint (api/v1/endpoints/files.py)
+
+UrlBuilder = Callable[[Optional[str]], Optional[str]]
+
+
+def file_url_prefix(request: Request, bucket: str) -> str:
+    """Absolute URL of the file streaming endpoint for `bucket`, object name appended by callers."""
+    base = str(request.base_url).rstrip("/")
+    return f"{base}{settings.API_V1_STR}/files/{bucket}/"
+
+
+def get_file_url(request: Request, bucket: str, object_name: str) -> str:
+    """Build an absolute URL for the file streaming endpoint."""
+    return file_url_prefix(request, bucket) + object_name
+
+
+def file_url_builder(request: Request, bucket: str) -> UrlBuilder:
+    """`get_file_url` for many objects of one bucket; None for a missing object."""
+    prefix = file_url_prefix(request, bucket)
+
+    def build(object_name: Optional[str]) -> Optional[str]:
+        return prefix + object_name if object_name else None
+
+    return build
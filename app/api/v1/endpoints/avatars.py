@@ -1,52 +1,59 @@
-from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends, Request
+from fastapi import APIRouter, HTTPException, File, UploadFile, Form, Depends, Request, Response, Query
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 import os
-import io
+from fastapi.concurrency import run_in_threadpool
 
 from app.api import deps
-from app.services.minio_client import MinioClient
+from app.api.pagination import keyset_paginate_async
+from app.api.serializers import AVATAR_COLUMNS, avatar_dicts
+from app.api.rate_limit import RateLimiter
+from app.services.streaming import FileTooLargeError
+from app.services.uploads import store_upload, discard_object
 from app.core.config import settings
-from app.api.v1.endpoints.files import get_file_url
+from app.api.urls import get_file_url
 from app.models.avatar import Avatar as AvatarModel
 from app.schemas.avatar import Avatar as AvatarSchema, AvatarCreate
 
 router = APIRouter()
-minio_client = MinioClient()
 
-@router.post("", response_model=AvatarSchema)
+@router.post("", response_model=AvatarSchema, dependencies=[Depends(RateLimiter("uploads", settings.RATE_LIMIT_UPLOADS))])
 async def create_avatar(
     request: Request,
     file: UploadFile = File(...),
     source_type: str = Form("Upload"),
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    # Read file content
-    file_content = await file.read()
-    
-    # Check size (200MB)
-    if len(file_content) > 200 * 1024 * 1024:
-        raise HTTPException(status_code=413, detail="File too large (max 200MB)")
-            
     filename = f"avatar_{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-    file_obj = io.BytesIO(file_content)
-    
-    # Upload to MinIO
-    minio_client.put_object(
-        settings.MINIO_BUCKET_AVATARS,
-        filename,
-        file_obj,
-        len(file_content),
-        content_type=file.content_type
+
+    # Stream to MinIO, checking size (200MB) on the fly
+    try:
+        stored = await run_in_threadpool(store_upload, file, settings.MINIO_BUCKET_AVATARS, filename, 200 * 1024 * 1024)
+    except FileTooLargeError:
+        raise HTTPException(status_code=413, detail="File too large (max 200MB)")
+
+    # Identical image already uploaded: point this avatar at the stored one. The
+    # row lock keeps a concurrent delete of the last avatar sharing it from
+    # removing the object before this row is committed
+    result = await db.execute(
+        select(AvatarModel).where(AvatarModel.content_hash == stored.sha256).limit(1).with_for_update()
     )
-    
+    existing = result.scalars().first()
+    duplicate = None
+    if existing:
+        duplicate, filename = filename, existing.filename
+
     # Create DB record
-    db_obj = AvatarModel(filename=filename, source_type=source_type)
-    
+    db_obj = AvatarModel(filename=filename, source_type=source_type, content_hash=stored.sha256)
+
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+
+    if duplicate:
+        await run_in_threadpool(discard_object, settings.MINIO_BUCKET_AVATARS, duplicate)
 
     return AvatarSchema(
         id=db_obj.id,
@@ -57,13 +64,13 @@ async def create_avatar(
     )
 
 @router.get("/{avatar_id}", response_model=AvatarSchema)
-async def get_avatar(avatar_id: str, request: Request, db: Session = Depends(deps.get_db)):
+async def get_avatar(avatar_id: str, request: Request, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(avatar_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
 
-    avatar = db.query(AvatarModel).filter(AvatarModel.id == uuid_id).first()
+    avatar = await db.get(AvatarModel, uuid_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
         
@@ -76,29 +83,39 @@ async def get_avatar(avatar_id: str, request: Request, db: Session = Depends(dep
     )
 
 @router.get("", response_model=List[AvatarSchema])
-async def list_avatars(request: Request, db: Session = Depends(deps.get_db)):
-    avatars = db.query(AvatarModel).order_by(AvatarModel.created_at.desc()).all()
-    return [
-        AvatarSchema(
-            id=a.id,
-            filename=a.filename,
-            source_type=a.source_type,
-            created_at=a.created_at,
-            image_url=get_file_url(request, settings.MINIO_BUCKET_AVATARS, a.filename)
-        ) for a in avatars
-    ]
+async def list_avatars(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(deps.get_async_db)
+):
+    stmt = select(*AVATAR_COLUMNS)
+    avatars = await keyset_paginate_async(db, stmt, AvatarModel.created_at, AvatarModel.id, cursor, limit, response, scalars=False)
+    return avatar_dicts(request, avatars)
 
 @router.delete("/{avatar_id}", status_code=204)
-async def delete_avatar(avatar_id: str, db: Session = Depends(deps.get_db)):
+async def delete_avatar(avatar_id: str, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(avatar_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
         
-    avatar = db.query(AvatarModel).filter(AvatarModel.id == uuid_id).first()
+    avatar = await db.get(AvatarModel, uuid_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
         
-    db.delete(avatar)
-    db.commit()
+    # The image object is shared by avatars with the same content, remove it with
+    # the last one. Locking the sharers makes a concurrent create that reuses the
+    # image wait for this transaction (or be counted below if it committed first)
+    filename = avatar.filename
+    await db.execute(select(AvatarModel.id).where(AvatarModel.filename == filename).with_for_update())
+    await db.delete(avatar)
+    await db.flush()
+    result = await db.execute(select(func.count()).select_from(AvatarModel).where(AvatarModel.filename == filename))
+    shared = result.scalar()
+    await db.commit()
+
+    if not shared:
+        await run_in_threadpool(discard_object, settings.MINIO_BUCKET_AVATARS, filename)
     return None
@@ -3,25 +3,17 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 import logging
 import json
-import aiohttp
-import os
-import io
-import tempfile
-import uuid
 
 from app.api import deps
 from app.models.motion_cache import MotionCache as MotionModel
 from app.schemas.motion_cache import JobStatus
-from app.services.minio_client import MinioClient
-from app.services.video import generate_thumbnail
-from app.core.config import settings
+from app.worker.tasks import process_motion_result_task
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
-minio_client = MinioClient()
 
 @router.post("")
-async def handle_callback(
+def handle_callback(
     payload: dict = Body(...),
     db: Session = Depends(deps.get_db)
 ):
@@ -65,66 +57,9 @@ async def handle_callback(
             logger.error(f"Failed to parse resultJson: {e}")
         
         if video_url:
-            motion_thumbnail_url = None
-            local_video_url = None
-            try:
-                # Download video to temp
-                temp_video = tempfile.mktemp(suffix=".mp4")
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(video_url) as resp:
-                        if resp.status == 200:
-                            content = await resp.read()
-                            with open(temp_video, "wb") as f:
-                                f.write(content)
-                            
-                            # Upload video to MinIO (Motion Videos)
-                            video_filename = f"motion_{task_id}_{uuid.uuid4()}.mp4"
-                            video_file = io.BytesIO(content)
-                            minio_client.put_object(
-                                settings.MINIO_BUCKET_MOTIONS,
-                                video_filename,
-                                video_file,
-                                len(content),
-                                content_type="video/mp4"
-                            )
-                            # local_video_url = minio_client.get_url(settings.MINIO_BUCKET_MOTIONS, video_filename)
-                            base_url = settings.CALLBACK_BASE_URL or "" 
-                            base_url = base_url.rstrip("/")
-                            local_video_url = f"{base_url}{settings.API_V1_STR}/files/{settings.MINIO_BUCKET_MOTIONS}/{video_filename}"
-
-                            # Generate thumbnail
-                            thumb_path = generate_thumbnail(temp_video)
-                            if thumb_path:
-                                thumb_filename = f"thumb_motion_{task_id}_{uuid.uuid4()}.jpg"
-                                with open(thumb_path, "rb") as tf:
-                                    thumb_content = tf.read()
-                                    thumb_file = io.BytesIO(thumb_content)
-                                    minio_client.put_object(
-                                        settings.MINIO_BUCKET_MOTIONS,
-                                        thumb_filename,
-                                        thumb_file,
-                                        len(thumb_content),
-                                        content_type="image/jpeg"
-                                    )
-                                    # motion_thumbnail_url = minio_client.get_url(settings.MINIO_BUCKET_MOTIONS, thumb_filename)
-                                    motion_thumbnail_url = f"{base_url}{settings.API_V1_STR}/files/{settings.MINIO_BUCKET_MOTIONS}/{thumb_filename}"
-                                
-                                try: os.remove(thumb_path)
-                                except: pass
-                
-                if os.path.exists(temp_video):
-                    try: os.remove(temp_video)
-                    except: pass
-            except Exception as e:
-                logger.error(f"Failed to process video/thumbnail for callback {task_id}: {e}")
-
-            # Update DB record with info (Success)
-            motion_task.status = JobStatus.SUCCESS.value
-            motion_task.motion_video_url = local_video_url or video_url # Fallback to external if local fails? Or keeping external?
-            motion_task.motion_thumbnail_url = motion_thumbnail_url
-            
-            db.commit()
+            # Download/upload/thumbnail happen in the worker, the record is
+            # flipped to success there once the video is stored locally
+            process_motion_result_task.delay(str(motion_task.id), video_url)
 
     else:
         # handle fail
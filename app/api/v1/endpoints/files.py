@@ -1,9 +1,16 @@
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse, RedirectResponse
+from datetime import timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import urlsplit
+import logging
+from typing import List, Optional, Tuple
+import uuid
 from app.services.minio_client import minio_client
 from app.core.config import settings
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 ALLOWED_BUCKETS = {
     settings.MINIO_BUCKET_AUDIO,
@@ -20,55 +27,252 @@ CONTENT_TYPES = {
     ".wav": "audio/wav",
     ".webm": "video/webm",
     ".mkv": "video/x-matroska",
+    ".jpg": "image/jpeg",
+    ".webp": "image/webp",
 }
 
+CHUNK_SIZE = 32 * 1024
 
-def get_file_url(request: Request, bucket: str, object_name: str) -> str:
-    """Build an absolute URL for the file streaming endpoint."""
-    base = str(request.base_url).rstrip("/")
-    return f"{base}{settings.API_V1_STR}/files/{bucket}/{object_name}"
+# Objects written once under a unique (id-based) name and never modified
+IMMUTABLE_PREFIXES = ("edit_", "thumb_", "sprite_", "motion_")
+
+
+def cache_control_for(object_name: str) -> str:
+    if object_name.startswith(IMMUTABLE_PREFIXES):
+        return "public, max-age=31536000, immutable"
+    return "public, max-age=3600"
+
+
+# More ranges than this in one request are ignored (full body is served),
+# so a request can't make us stream the same object over and over
+MAX_RANGES = 16
+
+
+def parse_range_header(range_header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a `Range: bytes=...` header into a sorted list of inclusive (start, end)
+    pairs, overlapping and adjacent ranges merged.
+    Returns None when the header is absent, malformed or asks for more than
+    MAX_RANGES ranges (serve the full body), an empty list when no range is satisfiable.
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+
+    parts = range_header[len("bytes="):].split(",")
+    if len(parts) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for part in parts:
+        part = part.strip()
+        if "-" not in part:
+            return None
+        start_s, end_s = part.split("-", 1)
+        try:
+            if start_s == "":
+                # Suffix range: last N bytes
+                suffix = int(end_s)
+                if suffix <= 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+            else:
+                start = int(start_s)
+                if start >= size:
+                    continue
+                end = int(end_s) if end_s else size - 1
+                if start > end:
+                    return None
+        except ValueError:
+            return None
+        ranges.append((start, min(end, size - 1)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_matches(if_range: Optional[str], stat) -> bool:
+    """If-Range holds either an ETag or an HTTP date; ranges apply only if it still matches."""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Weak validators never match for range requests
+        return if_range == f'"{stat.etag}"'
+    if stat.last_modified is None:
+        return False
+    return if_range == http_date(stat.last_modified)
+
+
+def http_date(dt) -> Optional[str]:
+    return formatdate(dt.timestamp(), usegmt=True) if dt else None
+
+
+def is_not_modified(request: Request, etag: str, last_modified) -> bool:
+    """Evaluate If-None-Match (takes precedence) or If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        # Weak comparison: W/"x" matches "x"
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def iter_object(bucket: str, object_name: str, offset: int = 0, length: int = 0):
+    response = minio_client.client.get_object(bucket, object_name, offset=offset, length=length)
+    try:
+        for chunk in response.stream(CHUNK_SIZE):
+            yield chunk
+    finally:
+        response.close()
+        response.release_conn()
+
+
+def offload_response(bucket: str, object_name: str) -> Optional[Response]:
+    """
+    Redirect/X-Accel response for FILE_DELIVERY_MODE "presigned"/"accel".
+    Returns None (serve through the proxy) in "proxy" mode or if signing fails.
+    """
+    mode = settings.FILE_DELIVERY_MODE
+    if mode not in ("presigned", "accel"):
+        return None
+
+    expires = timedelta(seconds=settings.FILE_URL_TTL_SECONDS)
+    try:
+        if mode == "presigned" and minio_client.public_client:
+            url = minio_client.get_presigned_url(bucket, object_name, expires=expires, public=True)
+            # Don't let caches keep the redirect longer than the signature lives
+            return RedirectResponse(url, status_code=307, headers={"Cache-Control": "no-store"})
+
+        if mode == "accel":
+            # nginx re-issues the signed request to MinIO (Host must stay the
+            # internal one, see nginx/conf.d), forwarding the client's Range headers
+            signed = urlsplit(minio_client.get_presigned_url(bucket, object_name, expires=expires))
+            return Response(headers={
+                "X-Accel-Redirect": f"{settings.FILE_ACCEL_PREFIX}{signed.path}?{signed.query}",
+                "X-Accel-Buffering": "no",
+                "Content-Disposition": f'inline; filename="{object_name}"',
+                "Cache-Control": cache_control_for(object_name),
+            })
+    except Exception as e:
+        logger.warning(f"Falling back to proxy delivery for {bucket}/{object_name}: {e}")
+    return None
 
 
 @router.get("/{bucket}/{object_name}")
-def stream_file(bucket: str, object_name: str):
+def stream_file(bucket: str, object_name: str, request: Request):
     """
     Stream a file directly from MinIO storage.
     Works as a reverse-proxy so the client doesn't need direct MinIO access.
+    Honors single and multi-part Range requests (with If-Range) so that seeking
+    in a media player only fetches the bytes it needs.
     """
     if bucket not in ALLOWED_BUCKETS:
         raise HTTPException(status_code=403, detail="Access to this bucket is denied")
 
+    # Take the Python process out of the data path when configured to
+    offloaded = offload_response(bucket, object_name)
+    if offloaded is not None:
+        return offloaded
+
     try:
-        response = minio_client.client.get_object(bucket, object_name)
+        stat = minio_client.stat_object(bucket, object_name)
     except Exception:
         raise HTTPException(status_code=404, detail="File not found")
 
-    # Determine content type from headers or extension
-    content_type = response.headers.get("Content-Type", "application/octet-stream")
+    # Determine content type from metadata or extension
+    content_type = stat.content_type or "application/octet-stream"
     if content_type == "application/octet-stream":
         ext = "." + object_name.rsplit(".", 1)[-1] if "." in object_name else ""
         content_type = CONTENT_TYPES.get(ext, content_type)
 
-    content_length = response.headers.get("Content-Length")
+    size = stat.size
+    etag = f'"{stat.etag}"'
+    validators = {"ETag": etag, "Cache-Control": cache_control_for(object_name)}
+    if stat.last_modified:
+        validators["Last-Modified"] = http_date(stat.last_modified)
+
+    # Revalidation of an unchanged object costs one stat, no body
+    if is_not_modified(request, etag, stat.last_modified):
+        return Response(status_code=304, headers=validators)
 
     headers = {
         "Content-Disposition": f'inline; filename="{object_name}"',
         "Accept-Ranges": "bytes",
-        "Cache-Control": "public, max-age=3600",
+        **validators,
     }
-    if content_length:
-        headers["Content-Length"] = content_length
 
-    def iterfile():
-        try:
-            for chunk in response.stream(32 * 1024):
-                yield chunk
-        finally:
-            response.close()
-            response.release_conn()
+    ranges = None
+    if if_range_matches(request.headers.get("if-range"), stat):
+        ranges = parse_range_header(request.headers.get("range"), size)
+
+    if ranges is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            iter_object(bucket, object_name),
+            media_type=content_type,
+            headers=headers,
+        )
+
+    if not ranges:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            iter_object(bucket, object_name, start, end - start + 1),
+            status_code=206,
+            media_type=content_type,
+            headers=headers,
+        )
+
+    # Multiple ranges: multipart/byteranges body
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"\r\n--{boundary}--\r\n".encode()
+    headers["Content-Length"] = str(
+        sum(len(h) for h in part_headers)
+        + sum(end - start + 1 for start, end in ranges)
+        + 2 * (len(ranges) - 1)
+        + len(closing)
+    )
+
+    def itermultipart():
+        for i, (start, end) in enumerate(ranges):
+            if i:
+                yield b"\r\n"
+            yield part_headers[i]
+            yield from iter_object(bucket, object_name, start, end - start + 1)
+        yield closing
 
     return StreamingResponse(
-        iterfile(),
-        media_type=content_type,
+        itermultipart(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
         headers=headers,
     )
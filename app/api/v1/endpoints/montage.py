@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Query
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, timedelta
+from typing import List, Optional
+import hashlib
+import logging
 import uuid
 
 from app.api import deps
+from app.api.pagination import DEFAULT_PAGE_SIZE, keyset_paginate
+from app.api.rate_limit import RateLimiter
+from app.api.serializers import EDIT_COLUMNS, edit_dict, edit_dicts, select_edits
+from app.api.urls import file_url_builder
 from app.models.motion_cache import MotionCache
 from app.models.video import Video
 from app.models.edit import Edit, EditStatus
@@ -11,12 +20,49 @@ from app.models.track import Track
 from app.schemas.edit import EditRequest, EditResponse
 from app.worker.tasks import process_edit_task
 from app.core.config import settings
-from app.api.v1.endpoints.files import get_file_url
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Bump whenever process_edit_task changes its output, so old renders are not reused
+RENDER_PARAMS = "replace_audio:v1"
+
+
+def render_cache_key(source_bucket: str, source_object: str, track_id, track_object: str) -> str:
+    # track_id is part of the key: deduplicated tracks share one object, but a
+    # cached edit must point at the track the caller asked for
+    raw = f"{source_bucket}/{source_object}|{track_id}|{settings.MINIO_BUCKET_AUDIO}/{track_object}|{RENDER_PARAMS}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def expire_stale_edits(render_key: str, now: Optional[datetime] = None):
+    """
+    UPDATE statement failing the in-flight edits of `render_key` older than
+    EDIT_INFLIGHT_TTL_MINUTES, so a lost render stops being served from the
+    cache and holding the uq_edits_render_key_active slot.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(minutes=settings.EDIT_INFLIGHT_TTL_MINUTES)
+    return (
+        update(Edit)
+        .where(
+            Edit.render_key == render_key,
+            Edit.status.in_([EditStatus.pending, EditStatus.processing]),
+            Edit.created_at < cutoff,
+        )
+        .values(status=EditStatus.failed)
+        .execution_options(synchronize_session=False)
+    )
+
 
+def to_edit_response(request: Request, e: Edit, track: Optional[Track] = None) -> dict:
+    data = edit_dict(file_url_builder(request, settings.MINIO_BUCKET_PROCESSED), e)
+    if track is not None and track.id == e.track_id:
+        data["track_name"] = track.name
+        data["track_artist"] = track.artist
+    return data
 
-@router.post("", response_model=EditResponse)
+
+@router.post("", response_model=EditResponse, dependencies=[Depends(RateLimiter("montage", settings.RATE_LIMIT_MONTAGE))])
 def create_montage(
     payload: EditRequest,
     request: Request,
@@ -34,6 +80,9 @@ def create_montage(
         if motion.status != "success": 
             raise HTTPException(status_code=400, detail="Motion video is not ready for editing")
         motion_id = motion.id
+        # Same heuristic as the worker: object name is the last part of the URL
+        source_bucket = settings.MINIO_BUCKET_MOTIONS
+        source_object = (motion.motion_video_url or "").split("/")[-1]
 
     elif payload.video_id:
         video = db.query(Video).filter(Video.id == payload.video_id).first()
@@ -43,6 +92,8 @@ def create_montage(
         if video.status != "downloaded" and video.status != "completed": # Accomodate possible statuses
              raise HTTPException(status_code=400, detail="Reference video is not ready (not downloaded)")
         video_id = video.id
+        source_bucket = settings.MINIO_BUCKET_TIKTOK
+        source_object = video.file_path
 
     else:
         raise HTTPException(status_code=400, detail="Either motion_id or video_id must be provided")
@@ -51,60 +102,65 @@ def create_montage(
     if not track:
         raise HTTPException(status_code=404, detail="Track not found")
 
+    # Render cache: reuse a completed or in-flight edit of the same inputs
+    render_key = render_cache_key(source_bucket, source_object, track.id, track.file_path)
+    if db.execute(expire_stale_edits(render_key)).rowcount:
+        db.commit()
+    cached = (
+        db.query(Edit)
+        .filter(Edit.render_key == render_key, Edit.status != EditStatus.failed)
+        .first()
+    )
+    if cached:
+        return to_edit_response(request, cached, track)
+
     edit_job = Edit(
         motion_id=motion_id,
         video_id=video_id,
         track_id=track.id,
         status=EditStatus.pending,
+        render_key=render_key,
     )
     db.add(edit_job)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request created the same render first, attach to it
+        db.rollback()
+        cached = (
+            db.query(Edit)
+            .filter(Edit.render_key == render_key, Edit.status != EditStatus.failed)
+            .first()
+        )
+        if not cached:
+            raise HTTPException(status_code=409, detail="Montage is being created, retry")
+        return to_edit_response(request, cached, track)
     db.refresh(edit_job)
 
-    process_edit_task.delay(str(edit_job.id))
+    try:
+        process_edit_task.delay(str(edit_job.id))
+    except Exception as e:
+        # Never leave a pending edit nobody will render in the cache slot
+        logger.error(f"Failed to enqueue edit {edit_job.id}: {e}")
+        edit_job.status = EditStatus.failed
+        db.commit()
+        raise HTTPException(status_code=503, detail="Could not queue the montage, retry")
 
-    return EditResponse(
-        id=edit_job.id,
-        motion_id=motion_id,
-        video_id=video_id,
-        track_id=track.id,
-        status=edit_job.status.value,
-        file_url=None,
-        thumbnail_url=None,
-    )
+    return to_edit_response(request, edit_job, track)
 
 
 @router.get("", response_model=List[EditResponse])
 def list_all_montages(
     request: Request,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500),
     db: Session = Depends(deps.get_db),
 ):
-    """List all generated montages across all videos."""
-    edits = (
-        db.query(Edit)
-        .filter(Edit.status != EditStatus.failed)
-        .order_by(Edit.id.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return [
-        EditResponse(
-            id=e.id,
-            motion_id=e.motion_id,
-            track_id=e.track_id,
-            status=e.status.value if hasattr(e.status, "value") else e.status,
-            file_url=get_file_url(request, settings.MINIO_BUCKET_PROCESSED, e.processed_file_path)
-            if e.processed_file_path
-            else None,
-            thumbnail_url=get_file_url(request, settings.MINIO_BUCKET_PROCESSED, e.thumbnail_path)
-            if e.thumbnail_path
-            else None,
-        )
-        for e in edits
-    ]
+    """List all generated montages across all videos, newest first (cursor in X-Next-Cursor)."""
+    query = select_edits(db.query(*EDIT_COLUMNS)).filter(Edit.status != EditStatus.failed)
+    edits = keyset_paginate(query, Edit.created_at, Edit.id, cursor, limit, response)
+    return edit_dicts(request, edits)
 
 
 @router.get("/{montage_id}", response_model=EditResponse)
@@ -114,21 +170,10 @@ def get_montage(
     db: Session = Depends(deps.get_db),
 ):
     """Get a single montage by ID."""
-    e = db.query(Edit).filter(Edit.id == montage_id).first()
+    e = select_edits(db.query(*EDIT_COLUMNS)).filter(Edit.id == montage_id).first()
     if not e:
         raise HTTPException(status_code=404, detail="Montage not found")
-    return EditResponse(
-        id=e.id,
-        motion_id=e.motion_id,
-        track_id=e.track_id,
-        status=e.status.value if hasattr(e.status, "value") else e.status,
-        file_url=get_file_url(request, settings.MINIO_BUCKET_PROCESSED, e.processed_file_path)
-        if e.processed_file_path
-        else None,
-        thumbnail_url=get_file_url(request, settings.MINIO_BUCKET_PROCESSED, e.thumbnail_path)
-        if e.thumbnail_path
-        else None,
-    )
+    return edit_dicts(request, [e])[0]
 
 
 @router.delete("/{montage_id}")
@@ -146,7 +191,7 @@ def delete_montage(
         try:
             from app.services.minio_client import minio_client
 
-            minio_client.client.remove_object(settings.MINIO_BUCKET_PROCESSED, e.processed_file_path)
+            minio_client.remove_object(settings.MINIO_BUCKET_PROCESSED, e.processed_file_path)
         except Exception:
             pass  # file may already be gone
 
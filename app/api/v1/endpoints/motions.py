@@ -1,44 +1,63 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
-from typing import List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
 
 from app.api import deps
+from app.api.pagination import keyset_paginate_async
+from app.api.rate_limit import RateLimiter
 from app.models.motion_cache import MotionCache as MotionModel
 from app.models.avatar import Avatar as AvatarModel
 from app.models.video import Video as VideoModel
 from app.schemas.motion_cache import MotionCache, MotionCacheCreate, JobStatus
-from app.services.motion_service import request_motion_generation
-from app.api.v1.endpoints.files import get_file_url
+from app.services.motion_service import expire_stale_motions, request_motion_generation
+from app.api.urls import get_file_url
 from app.core.config import settings
 
 router = APIRouter()
 
-@router.post("", response_model=MotionCache)
+async def find_reusable_motion(db: AsyncSession, avatar_id, reference_id):
+    result = await db.execute(
+        select(MotionModel).where(
+            MotionModel.avatar_id == avatar_id,
+            MotionModel.reference_id == reference_id,
+            MotionModel.status.in_([
+                JobStatus.SUCCESS.value,
+                JobStatus.PENDING.value,
+                JobStatus.PROCESSING.value,
+            ])
+        ).order_by(MotionModel.created_at.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+@router.post("", response_model=MotionCache, dependencies=[Depends(RateLimiter("motions", settings.RATE_LIMIT_MOTIONS))])
 async def create_motion_cache(
     motion: MotionCacheCreate,
     request: Request,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    # Check if exists (idempotency for same avatar+reference+success)
-    existing = db.query(MotionModel).filter(
-        MotionModel.avatar_id == motion.avatar_id,
-        MotionModel.reference_id == motion.reference_id,
-        MotionModel.status == JobStatus.SUCCESS.value
-    ).first()
-        
+    # Release the slot of a generation that never finished
+    expired = await db.execute(expire_stale_motions(motion.avatar_id, motion.reference_id))
+    if expired.rowcount:
+        await db.commit()
+
+    # Check if exists (idempotency for same avatar+reference+success),
+    # or join a generation that is already in flight
+    existing = await find_reusable_motion(db, motion.avatar_id, motion.reference_id)
     if existing:
         return existing
 
     # Fetch URLs
     # Check Avatar
-    avatar = db.query(AvatarModel).filter(AvatarModel.id == motion.avatar_id).first()
+    avatar = await db.get(AvatarModel, motion.avatar_id)
     if not avatar:
         raise HTTPException(status_code=404, detail="Avatar not found")
     avatar_url = get_file_url(request, settings.MINIO_BUCKET_AVATARS, avatar.filename)
 
     # Check Reference Motion (Video)
-    reference = db.query(VideoModel).filter(VideoModel.id == motion.reference_id).first()
+    reference = await db.get(VideoModel, motion.reference_id)
     if not reference:
         raise HTTPException(status_code=404, detail="Reference motion (Video) not found")
 
@@ -48,53 +67,72 @@ async def create_motion_cache(
     else:
          ref_url = reference.original_url
 
+    # Claim the in-flight slot before calling the paid external API; the partial
+    # unique index makes concurrent identical requests lose here and reuse the winner
+    new_motion = MotionModel(
+        avatar_id=motion.avatar_id,
+        reference_id=motion.reference_id,
+        status=JobStatus.PENDING.value
+    )
+    db.add(new_motion)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        existing = await find_reusable_motion(db, motion.avatar_id, motion.reference_id)
+        if existing:
+            return existing
+        raise HTTPException(status_code=409, detail="Motion generation already in progress")
+    await db.refresh(new_motion)
+
     # Call External API via Service
     try:
         task_id = await request_motion_generation(avatar_url, ref_url)
     except Exception as e:
+        new_motion.status = JobStatus.FAILED.value
+        new_motion.error_log = str(e)
+        await db.commit()
         raise HTTPException(status_code=500, detail=f"Failed to initiate motion generation: {str(e)}")
 
-    # Create Motion Cache Entry
-    new_motion = MotionModel(
-        avatar_id=motion.avatar_id,
-        reference_id=motion.reference_id,
-        status=JobStatus.PROCESSING.value,
-        external_job_id=task_id
-    )
-
-    db.add(new_motion)
-    db.commit()
-    db.refresh(new_motion)
+    new_motion.status = JobStatus.PROCESSING.value
+    new_motion.external_job_id = task_id
+    await db.commit()
+    await db.refresh(new_motion)
     
     return new_motion
 
 @router.get("", response_model=List[MotionCache])
-async def list_motion(db: Session = Depends(deps.get_db)):
-    return db.query(MotionModel).order_by(MotionModel.created_at.desc()).all()
+async def list_motion(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(deps.get_async_db)
+):
+    return await keyset_paginate_async(db, select(MotionModel), MotionModel.created_at, MotionModel.id, cursor, limit, response)
 
 @router.get("/{motion_id}", response_model=MotionCache)
-async def get_motion(motion_id: str, db: Session = Depends(deps.get_db)):
+async def get_motion(motion_id: str, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(motion_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
 
-    item = db.query(MotionModel).filter(MotionModel.id == uuid_id).first()
+    item = await db.get(MotionModel, uuid_id)
     if not item:
         raise HTTPException(status_code=404, detail="Motion not found")
     return item
 
 @router.delete("/{motion_id}", status_code=204)
-async def delete_motion(motion_id: str, db: Session = Depends(deps.get_db)):
+async def delete_motion(motion_id: str, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(motion_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
         
-    item = db.query(MotionModel).filter(MotionModel.id == uuid_id).first()
+    item = await db.get(MotionModel, uuid_id)
     if not item:
         raise HTTPException(status_code=404, detail="Motion entry not found")
         
-    db.delete(item)
-    db.commit()
+    await db.delete(item)
+    await db.commit()
     return None
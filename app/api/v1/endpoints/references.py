@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
-from typing import List
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Query
+from typing import List, Optional
+from sqlalchemy import or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
 import uuid
 
 from app.api import deps
+from app.api.pagination import keyset_paginate_async
+from app.api.serializers import VIDEO_COLUMNS, video_dict, video_dicts
+from app.api.urls import file_url_builder
 from app.models.video import Video
 from app.schemas.video import VideoDownloadRequest, VideoResponse
-from app.worker.tasks import download_video_task
+from app.worker.tasks import enqueue_video_downloads
+from app.services.url_canonical import canonicalize_url, canonicalize_urls
 from app.core.config import settings
-from app.api.v1.endpoints.files import get_file_url
 
 router = APIRouter()
 
@@ -16,86 +22,102 @@ router = APIRouter()
 async def create_reference(
     payload: VideoDownloadRequest,
     request: Request,
-    db: Session = Depends(deps.get_db)
+    db: AsyncSession = Depends(deps.get_async_db)
 ):
-    responses = []
-    for url in payload.tiktok_urls:
-         # Check if this URL was already downloaded
-        existing = db.query(Video).filter(
-            Video.original_url == url,
-            Video.status != "deleted"
-        ).first()
+    # Canonical key per URL (short links resolved, within a time budget), so the
+    # same video pasted as a share link, mobile URL or with query params is
+    # downloaded once
+    canonical = await run_in_threadpool(
+        canonicalize_urls, payload.tiktok_urls, budget=settings.SHORT_LINK_RESOLVE_BUDGET_SECONDS
+    )
+    keys = list(dict.fromkeys(canonical.values()))
 
-        if existing:
-            responses.append(VideoResponse(
-                id=existing.id,
-                original_url=existing.original_url,
-                status=existing.status,
-                file_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, existing.file_path) if existing.file_path else None,
-                thumbnail_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, existing.thumbnail_path) if existing.thumbnail_path else None
-            ))
-            continue
-        
-        # Create new video entry
-        vid = Video(original_url=url, status="pending")
-        db.add(vid)
-        db.commit()
-        db.refresh(vid)
-        
-        # Trigger task for download
-        download_video_task.delay(str(vid.id))
+    # One query for every video that is already known
+    existing = {}
+    result = await db.execute(select(Video).where(
+        or_(Video.canonical_url.in_(keys), Video.original_url.in_(list(canonical))),
+        Video.status != "deleted"
+    ))
+    for v in result.scalars().all():
+        # Rows created before canonical_url existed are matched by original URL
+        existing.setdefault(v.canonical_url or canonical.get(v.original_url) or canonicalize_url(v.original_url), v)
+
+    # One bulk insert and a single commit for the new ones; a concurrent
+    # request inserting the same video makes the conflicting rows no-ops
+    first_url = {}
+    for url, key in canonical.items():
+        first_url.setdefault(key, url)
+    new_rows = [
+        {"id": uuid.uuid4(), "original_url": first_url[key], "canonical_url": key, "status": "pending"}
+        for key in keys if key not in existing
+    ]
+    new_ids = []
+    if new_rows:
+        stmt = (
+            pg_insert(Video)
+            .values(new_rows)
+            .on_conflict_do_nothing(
+                index_elements=[Video.canonical_url],
+                index_where=text("status != 'deleted'")
+            )
+            .returning(Video.id)
+        )
+        new_ids = [str(row_id) for row_id in (await db.execute(stmt)).scalars().all()]
+        await db.commit()
+
+        # Rows lost to a concurrent insert: pick up the winner
+        lost = [row["canonical_url"] for row in new_rows if str(row["id"]) not in new_ids]
+        if lost:
+            result = await db.execute(select(Video).where(Video.canonical_url.in_(lost), Video.status != "deleted"))
+            for v in result.scalars().all():
+                existing[v.canonical_url] = v
 
-        responses.append(VideoResponse(
-            id=vid.id,
-            original_url=vid.original_url,
-            status=vid.status,
-            file_url=None,
-            thumbnail_url=None
-        ))
-    return responses
+        # Trigger downloads as one batch with bounded parallelism
+        await run_in_threadpool(enqueue_video_downloads, new_ids)
+
+    responses = {
+        row["canonical_url"]: {"id": row["id"], "original_url": row["original_url"], "status": row["status"]}
+        for row in new_rows if str(row["id"]) in new_ids
+    }
+    url = file_url_builder(request, settings.MINIO_BUCKET_TIKTOK)
+    responses.update({key: video_dict(url, v) for key, v in existing.items()})
+    return [responses[canonical[url]] for url in payload.tiktok_urls]
 
 @router.get("", response_model=List[VideoResponse])
-async def list_references(request: Request, db: Session = Depends(deps.get_db)):
-    videos = db.query(Video).filter(Video.status != "deleted").order_by(Video.created_at.desc()).all()
-    return [
-        VideoResponse(
-            id=v.id,
-            original_url=v.original_url,
-            status=v.status,
-            file_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, v.file_path) if v.file_path else None,
-            thumbnail_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, v.thumbnail_path) if v.thumbnail_path else None
-        ) for v in videos
-    ]
+async def list_references(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(deps.get_async_db)
+):
+    stmt = select(*VIDEO_COLUMNS).where(Video.status != "deleted")
+    videos = await keyset_paginate_async(db, stmt, Video.created_at, Video.id, cursor, limit, response, scalars=False)
+    return video_dicts(request, videos)
 
 @router.get("/{reference_id}", response_model=VideoResponse)
-async def get_reference(reference_id: str, request: Request, db: Session = Depends(deps.get_db)):
+async def get_reference(reference_id: str, request: Request, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(reference_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
 
-    vid = db.query(Video).filter(Video.id == uuid_id).first()
+    vid = await db.get(Video, uuid_id)
     if not vid:
         raise HTTPException(status_code=404, detail="Reference motion not found")
-    return VideoResponse(
-        id=vid.id,
-        original_url=vid.original_url,
-        status=vid.status,
-        file_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, vid.file_path) if vid.file_path else None,
-        thumbnail_url=get_file_url(request, settings.MINIO_BUCKET_TIKTOK, vid.thumbnail_path) if vid.thumbnail_path else None
-    )
+    return video_dicts(request, [vid])[0]
 
 @router.delete("/{reference_id}", status_code=204)
-async def delete_reference(reference_id: str, db: Session = Depends(deps.get_db)):
+async def delete_reference(reference_id: str, db: AsyncSession = Depends(deps.get_async_db)):
     try:
         uuid_id = uuid.UUID(reference_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID")
         
-    vid = db.query(Video).filter(Video.id == uuid_id).first()
+    vid = await db.get(Video, uuid_id)
     if not vid:
         raise HTTPException(status_code=404, detail="Reference motion not found")
         
     vid.status = "deleted"
-    db.commit()
+    await db.commit()
     return None
@@ -1,36 +1,27 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uuid
-import io
 
 from app.api import deps
+from app.api.pagination import DEFAULT_PAGE_SIZE, keyset_paginate
+from app.api.rate_limit import RateLimiter
+from app.api.serializers import TRACK_COLUMNS, track_dicts
 from app.models.track import Track, TrackStatus
-from app.schemas.track import TrackResponse
-from app.services.minio_client import minio_client
+from app.schemas.track import TrackResponse, TrackPeaks
+from app.services.streaming import FileTooLargeError
+from app.services.uploads import store_upload, discard_object
+from app.services.track_search import search_tracks
 from app.core.config import settings
 from app.worker.tasks import process_track_task
-from app.api.v1.endpoints.files import get_file_url
+from app.api.urls import get_file_url
 
 router = APIRouter()
 
-# Simple Rate Limiter (Conceptual)
-# In production, use fastapi-limiter with Redis
-from fastapi import Request
-import time
-from collections import defaultdict
-upload_counters = defaultdict(list)
-
-def rate_limit(request: Request):
-    client_ip = request.client.host
-    now = time.time()
-    # Clean old
-    upload_counters[client_ip] = [t for t in upload_counters[client_ip] if now - t < 60]
-    if len(upload_counters[client_ip]) >= 5:
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    upload_counters[client_ip].append(now)
-
-@router.post("/upload", response_model=TrackResponse, dependencies=[Depends(rate_limit)])
+# Columns filled by process_track_task, copied when the audio is a duplicate
+ANALYSIS_COLUMNS = ("duration_seconds", "audio_codec", "bitrate", "sample_rate", "waveform_peaks")
+
+@router.post("/upload", response_model=TrackResponse, dependencies=[Depends(RateLimiter("uploads", settings.RATE_LIMIT_UPLOADS))])
 def upload_track(
     request: Request,
     name: str = Form(...),
@@ -41,18 +32,27 @@ def upload_track(
     if file.content_type not in ["audio/mpeg", "audio/wav", "audio/mp3"]:
         raise HTTPException(status_code=400, detail="Invalid file type. Only MP3/WAV allowed.")
     
-    # Check size - crude check by reading into memory (limit 50MB as per req)
+    # Limit 50MB as per req, enforced while streaming to storage
     MAX_SIZE = 50 * 1024 * 1024
-    content = file.file.read()
-    if len(content) > MAX_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
-    file.file.seek(0)
-    
+
     track_id = uuid.uuid4()
     ext = file.filename.split(".")[-1]
     object_name = f"audio_{track_id}.{ext}"
-    
+
+    # Upload to MinIO
+    try:
+        stored = store_upload(file, settings.MINIO_BUCKET_AUDIO, object_name, MAX_SIZE)
+    except FileTooLargeError:
+        raise HTTPException(status_code=400, detail="File too large")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Storage error: {str(e)}")
+
+    # Same bytes already stored: point at the existing object and reuse its analysis
+    duplicate = db.query(Track).filter(Track.content_hash == stored.sha256).first()
+    if duplicate:
+        discard_object(settings.MINIO_BUCKET_AUDIO, object_name)
+        object_name = duplicate.file_path
+
     # Create DB entry
     db_track = Track(
         id=track_id,
@@ -60,68 +60,55 @@ def upload_track(
         artist=artist,
         file_path=object_name,
         mimetype=file.content_type,
-        size_bytes=len(content),
+        size_bytes=stored.size,
+        content_hash=stored.sha256,
         status=TrackStatus.processing
     )
+    if duplicate and duplicate.duration_seconds is not None:
+        for column in ANALYSIS_COLUMNS:
+            setattr(db_track, column, getattr(duplicate, column))
+        db_track.status = TrackStatus.active
     db.add(db_track)
     try:
         db.commit()
         db.refresh(db_track)
     except Exception as e:
         db.rollback()
+        if not duplicate:
+            discard_object(settings.MINIO_BUCKET_AUDIO, object_name)
         raise HTTPException(status_code=400, detail="Track name already exists or db error")
 
-    # Upload to MinIO
-    try:
-        minio_client.put_object(
-            settings.MINIO_BUCKET_AUDIO,
-            object_name,
-            io.BytesIO(content),
-            len(content),
-            file.content_type
-        )
-    except Exception as e:
-        db.delete(db_track)
-        db.commit()
-        raise HTTPException(status_code=500, detail=f"Storage error: {str(e)}")
-
     # Trigger async processing
-    process_track_task.delay(str(track_id))
+    if db_track.status == TrackStatus.processing:
+        process_track_task.delay(str(track_id))
 
     # Construct response
     return TrackResponse(
         id=db_track.id,
         name=db_track.name,
         artist=db_track.artist,
-        duration_seconds=0, # Will be updated
+        duration_seconds=db_track.duration_seconds or 0, # Will be updated
         file_url=get_file_url(request, settings.MINIO_BUCKET_AUDIO, object_name),
-        size_mb=len(content) / (1024 * 1024)
+        size_mb=stored.size / (1024 * 1024)
     )
 
 @router.get("", response_model=List[TrackResponse])
 def list_tracks(
     request: Request,
-    skip: int = 0, 
-    limit: int = 100, 
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=500),
     search: Optional[str] = None,
     db: Session = Depends(deps.get_db)
 ):
-    query = db.query(Track).filter(Track.status == TrackStatus.active)
-    if search:
-        query = query.filter(Track.name.ilike(f"%{search}%") | Track.artist.ilike(f"%{search}%"))
-    
-    tracks = query.offset(skip).limit(limit).all()
-    
-    return [
-        TrackResponse(
-            id=t.id,
-            name=t.name,
-            artist=t.artist or "",
-            duration_seconds=t.duration_seconds,
-            file_url=get_file_url(request, settings.MINIO_BUCKET_AUDIO, t.file_path),
-            size_mb=t.size_bytes / (1024 * 1024)
-        ) for t in tracks
-    ]
+    query = db.query(*TRACK_COLUMNS).filter(Track.status == TrackStatus.active)
+    if search and search.strip():
+        # Ranked search returns the best `limit` matches, no cursor
+        tracks = search_tracks(query, search, limit)
+    else:
+        tracks = keyset_paginate(query, Track.uploaded_at, Track.id, cursor, limit, response)
+
+    return track_dicts(request, tracks)
 
 @router.get("/{track_id}", response_model=TrackResponse)
 def get_track(track_id: uuid.UUID, request: Request, db: Session = Depends(deps.get_db)):
@@ -138,6 +125,19 @@ def get_track(track_id: uuid.UUID, request: Request, db: Session = Depends(deps.
         size_mb=t.size_bytes / (1024 * 1024)
     )
 
+@router.get("/{track_id}/peaks", response_model=TrackPeaks)
+def get_track_peaks(track_id: uuid.UUID, response: Response, db: Session = Depends(deps.get_db)):
+    """Precomputed waveform peaks, a few KB instead of downloading the audio."""
+    row = db.query(Track.waveform_peaks).filter(Track.id == track_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Track not found")
+    if row.waveform_peaks is None:
+        raise HTTPException(status_code=404, detail="Waveform not available yet")
+
+    peaks = list(row.waveform_peaks)
+    response.headers["Cache-Control"] = "public, max-age=86400"
+    return TrackPeaks(track_id=track_id, buckets=len(peaks), peaks=peaks)
+
 @router.delete("/{track_id}")
 def delete_track(track_id: uuid.UUID, db: Session = Depends(deps.get_db)):
     t = db.query(Track).filter(Track.id == track_id).first()
@@ -0,0 +1,59 @@
+import logging
+from app.db.session import SessionLocal
+from app.models.video import Video
+from app.services.url_canonical import canonicalize_urls
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+def duplicate_marker(video_id) -> str:
+    # Unique non-null canonical_url for a live duplicate: keeps it out of the
+    # unique index's way and out of the next run's NULL scan
+    return f"duplicate:{video_id}"
+
+def backfill_canonical_urls() -> None:
+    # Videos added before URL canonicalization have no canonical_url, so new
+    # requests for the same video would never be deduplicated against them
+    db = SessionLocal()
+    try:
+        taken = {
+            key for (key,) in db.query(Video.canonical_url)
+            .filter(Video.canonical_url.isnot(None), Video.status != "deleted")
+        }
+        rows = (
+            db.query(Video.id, Video.original_url, Video.status)
+            .filter(Video.canonical_url.is_(None))
+            .order_by(Video.created_at, Video.id)
+            .all()
+        )
+        filled = duplicates = 0
+        for i in range(0, len(rows), BATCH_SIZE):
+            batch = rows[i:i + BATCH_SIZE]
+            canonical = canonicalize_urls(row.original_url for row in batch)
+            updates = []
+            for row in batch:
+                key = canonical[row.original_url]
+                if row.status != "deleted":
+                    # The unique index allows one live video per key: the oldest keeps it
+                    if key in taken:
+                        duplicates += 1
+                        key = duplicate_marker(row.id)
+                    else:
+                        taken.add(key)
+                updates.append({"id": row.id, "canonical_url": key})
+            if updates:
+                db.bulk_update_mappings(Video, updates)
+                db.commit()
+                filled += len(updates)
+        if filled or duplicates:
+            logger.info(f"Backfilled canonical_url on {filled} videos, {duplicates} live duplicates marked")
+    finally:
+        db.close()
+
+def main() -> None:
+    backfill_canonical_urls()
+
+if __name__ == "__main__":
+    main()
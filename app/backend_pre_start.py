@@ -6,7 +6,71 @@ from app.db.session import SessionLocal
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def main() -> None:
+def create_extensions() -> None:
+    # Extensions are not picked up by alembic autogenerate, create them before migrating
+    db = SessionLocal()
+    try:
+        db.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        db.commit()
+    finally:
+        db.close()
+
+# Pagination keys that used to be nullable; NULLs are filled before the
+# migration makes the columns NOT NULL
+PAGINATION_TIMESTAMPS = [
+    ("videos", "created_at"),
+    ("avatars", "created_at"),
+    ("motion_cache", "created_at"),
+    ("tracks", "uploaded_at"),
+]
+
+def table_exists(db, table: str) -> bool:
+    # Fresh database: tables are created by the migration
+    return db.execute(text("SELECT to_regclass(:t)"), {"t": table}).scalar() is not None
+
+def backfill_timestamps() -> None:
+    db = SessionLocal()
+    try:
+        for table, column in PAGINATION_TIMESTAMPS:
+            if not table_exists(db, table):
+                continue
+            result = db.execute(text(f"UPDATE {table} SET {column} = now() WHERE {column} IS NULL"))
+            if result.rowcount:
+                logger.info(f"Backfilled {result.rowcount} NULL {table}.{column}")
+        db.commit()
+    finally:
+        db.close()
+
+def dedupe_inflight_motions() -> None:
+    # uq_motion_cache_inflight allows one pending/processing motion per
+    # avatar+reference; older duplicates would make building it (and with it
+    # the whole migration) fail, so keep the newest and fail the others
+    db = SessionLocal()
+    try:
+        if not table_exists(db, "motion_cache"):
+            return
+        result = db.execute(text("""
+            UPDATE motion_cache
+            SET status = 'failed', error_log = 'Superseded by a newer in-flight generation'
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY avatar_id, reference_id
+                        ORDER BY created_at DESC NULLS LAST, id DESC
+                    ) AS rank
+                    FROM motion_cache
+                    WHERE status IN ('pending', 'processing')
+                ) ranked
+                WHERE rank > 1
+            )
+        """))
+        if result.rowcount:
+            logger.info(f"Failed {result.rowcount} duplicate in-flight motions")
+        db.commit()
+    finally:
+        db.close()
+
+def wait_for_db() -> None:
     logger.info("Initializing service - waiting for DB")
     retries = 0
     max_retries = 60
@@ -25,5 +89,12 @@ def main() -> None:
             
     raise Exception("Could not connect to DB")
 
+def main() -> None:
+    wait_for_db()
+    # Outside the retry loop: a failure here is a real error, not a DB still starting
+    create_extensions()
+    backfill_timestamps()
+    dedupe_inflight_motions()
+
 if __name__ == "__main__":
     main()
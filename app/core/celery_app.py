@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.signals import worker_process_init
 from app.core.config import settings
 
 celery_app = Celery("worker", broker=settings.CELERY_BROKER_URL, include=["app.worker.tasks"])
@@ -10,3 +11,12 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
 )
+
+@worker_process_init.connect
+def init_storage(**kwargs):
+    # Each prefork child warms its bucket cache once instead of on first upload
+    from app.services.minio_client import minio_client
+    try:
+        minio_client.ensure_buckets()
+    except Exception as e:
+        print(f"Could not create MinIO buckets at worker start: {e}")
@@ -11,12 +11,27 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = "postgres"
     POSTGRES_DB: str = "app"
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # asyncpg URI used by the API's AsyncSession, derived from the above if unset
+    ASYNC_SQLALCHEMY_DATABASE_URI: Optional[str] = None
+    # Connection pool per process (API worker / celery child)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
 
     # Redis (Celery)
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_RESULT_BACKEND: Optional[str] = None
+    REDIS_URL: Optional[str] = None
+
+    # Rate limits (requests per client IP per window)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_UPLOADS: int = 5
+    RATE_LIMIT_MONTAGE: int = 20
+    RATE_LIMIT_MOTIONS: int = 10
 
     # MinIO
     MINIO_URL: str = "minio:9000"
@@ -29,6 +44,65 @@ class Settings(BaseSettings):
     MINIO_BUCKET_REFERENCES: str = "references"
     MINIO_BUCKET_MOTIONS: str = "motions"
     MINIO_SECURE: bool = False
+    MINIO_REGION: str = "us-east-1"
+    MINIO_POOL_SIZE: int = 32
+    MINIO_CONNECT_TIMEOUT: float = 5.0
+    MINIO_READ_TIMEOUT: float = 300.0
+    # Browser-reachable MinIO endpoint, used for presigned redirects
+    MINIO_PUBLIC_URL: Optional[str] = None
+    MINIO_PUBLIC_SECURE: bool = True
+
+    # How /files serves media: "proxy" (stream through the API), "presigned"
+    # (redirect to a short-lived presigned URL on MINIO_PUBLIC_URL) or "accel"
+    # (nginx X-Accel-Redirect to the internal MinIO location)
+    FILE_DELIVERY_MODE: str = "proxy"
+    FILE_URL_TTL_SECONDS: int = 300
+    FILE_ACCEL_PREFIX: str = "/internal-minio"
+
+    # yt-dlp (reference downloads)
+    YTDLP_FORMAT: Optional[str] = None # overrides the default mp4 selector built from YTDLP_MAX_HEIGHT
+    YTDLP_MAX_HEIGHT: Optional[int] = 1080
+    YTDLP_MAX_FILESIZE_MB: Optional[int] = 200
+    YTDLP_INFO_CACHE_TTL: int = 600
+    YTDLP_INFO_CACHE_SIZE: int = 512
+
+    # Worker scratch space (per-job directories)
+    WORKSPACE_DIR: Optional[str] = None # defaults to the system temp dir
+    WORKSPACE_TMPFS_DIR: Optional[str] = "/dev/shm"
+    WORKSPACE_TMPFS_MAX_BYTES: int = 256 * 1024 * 1024
+    WORKSPACE_RESERVE_BYTES: int = 512 * 1024 * 1024
+
+    # How process_edit_task reads its inputs: "cache" (local media cache,
+    # fetched in parallel) or "url" (ffmpeg reads presigned MinIO URLs directly)
+    EDIT_SOURCE_MODE: str = "cache"
+
+    # Worker-local LRU cache of source media (videos, tracks)
+    MEDIA_CACHE_DIR: str = "/tmp/media-cache"
+    MEDIA_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024
+
+    # Thumbnails and hover-scrub sprite sheets
+    THUMBNAIL_GRID_WIDTH: int = 360
+    THUMBNAIL_DETAIL_WIDTH: int = 720
+    SPRITE_COLUMNS: int = 5
+    SPRITE_ROWS: int = 5
+    SPRITE_FRAME_WIDTH: int = 160
+    SPRITE_FORMAT: str = "jpg" # or "webp"
+
+    # Track waveform previews
+    WAVEFORM_BUCKETS: int = 2000
+
+    # Max reference downloads running in parallel for one batch request
+    REFERENCE_DOWNLOAD_CONCURRENCY: int = 8
+    # Total time a reference request may spend resolving share links (HEAD
+    # requests); links still unresolved are keyed by their normalized URL
+    SHORT_LINK_RESOLVE_BUDGET_SECONDS: float = 3.0
+
+    # In-flight motion generations older than this are treated as lost
+    # (crash before the KIE call, callback never delivered) and marked failed
+    MOTION_INFLIGHT_TTL_MINUTES: int = 30
+    # Same for montage renders (task never enqueued, worker died mid-render),
+    # so the render cache stops handing out the dead edit
+    EDIT_INFLIGHT_TTL_MINUTES: int = 60
 
     # External APIs
     KIE_API_KEY: Optional[str] = None
@@ -37,6 +111,11 @@ class Settings(BaseSettings):
     def model_post_init(self, __context):
         if self.SQLALCHEMY_DATABASE_URI is None:
             self.SQLALCHEMY_DATABASE_URI = f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+        if self.ASYNC_SQLALCHEMY_DATABASE_URI is None:
+            rest = self.SQLALCHEMY_DATABASE_URI.split("://", 1)[1]
+            self.ASYNC_SQLALCHEMY_DATABASE_URI = f"postgresql+asyncpg://{rest}"
+        if self.REDIS_URL is None:
+            self.REDIS_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/1"
         if self.CELERY_BROKER_URL is None:
             self.CELERY_BROKER_URL = f"redis://{self.REDIS_HOST}:{self.REDIS_PORT}/0"
         if self.CELERY_RESULT_BACKEND is None:
@@ -1,6 +1,21 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+pool_options = dict(
+    pool_pre_ping=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+)
+
+# Sync engine: celery tasks, sync endpoints and startup scripts
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine (asyncpg): `async def` endpoints, so queries don't block the event loop.
+# Objects stay loaded after commit, async sessions can't lazy-refresh them on access.
+async_engine = create_async_engine(settings.ASYNC_SQLALCHEMY_DATABASE_URI, **pool_options)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -3,6 +3,8 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from app.api.v1.api import api_router
 from app.core.config import settings
+from app.services.minio_client import minio_client
+import logging
 import os
 
 # Frontend build directory
@@ -20,6 +22,14 @@ app = FastAPI(
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+def create_buckets():
+    # Buckets are created once here instead of checked on every upload
+    try:
+        minio_client.ensure_buckets()
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not create MinIO buckets at startup: {e}")
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -1,11 +1,17 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 
 class Avatar(Base):
+    __table_args__ = (
+        Index("ix_avatars_created_at", "created_at", "id"),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String, nullable=False)
     source_type = Column(String, default="Upload")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    content_hash = Column(String(64), nullable=True, index=True) # sha256 of the image
+    # NOT NULL: it is the pagination key (legacy NULLs backfilled in backend_pre_start)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
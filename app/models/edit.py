@@ -1,5 +1,6 @@
 import uuid
-from sqlalchemy import Column, String, ForeignKey, Enum as SQLEnum
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, func, text, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from app.models.base import Base
@@ -18,9 +19,27 @@ class Edit(Base):
     track_id = Column(UUID(as_uuid=True), ForeignKey('tracks.id'), nullable=False)
     processed_file_path = Column(String, nullable=True)
     thumbnail_path = Column(String, nullable=True)
+    thumbnail_detail_path = Column(String, nullable=True)
+    sprite_path = Column(String, nullable=True)
     edit_task_id = Column(UUID(as_uuid=True), nullable=True)
     status = Column(SQLEnum(EditStatus, name="edit_status"), default=EditStatus.pending)
+    # sha256 of (source object, track object, render params), see montage endpoint
+    render_key = Column(String(64), nullable=True)
+    # server_default backfills existing rows when the column is added
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
     
+    __table_args__ = (
+        # At most one live (non-failed) render per input combination
+        Index(
+            "uq_edits_render_key_active",
+            "render_key",
+            unique=True,
+            postgresql_where=text("status != 'failed'"),
+        ),
+        # Serves the list query (status != 'failed', newest first)
+        Index("ix_edits_created_at_active", "created_at", "id", postgresql_where=text("status != 'failed'")),
+    )
+
     motion = relationship("MotionCache")
     video = relationship("Video")
     track = relationship("Track")
@@ -1,18 +1,39 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, Float, Integer, ForeignKey, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 
 class MotionCache(Base):
     __tablename__ = "motion_cache"
+    __table_args__ = (
+        # Only one in-flight generation per avatar+reference, concurrent requests share it
+        Index(
+            "uq_motion_cache_inflight",
+            "avatar_id",
+            "reference_id",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'processing')"),
+        ),
+        Index("ix_motion_cache_created_at", "created_at", "id"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     avatar_id = Column(UUID(as_uuid=True), nullable=False) # ForeignKey('avatars.id') if needed, but loose coupling is fine too
     reference_id = Column(UUID(as_uuid=True), nullable=False) # ForeignKey('referencemotions.id')
     motion_video_url = Column(String, nullable=True)
     motion_thumbnail_url = Column(String, nullable=True)
+    motion_thumbnail_detail_url = Column(String, nullable=True)
+    motion_sprite_url = Column(String, nullable=True)
+    # Filled from ffprobe (services/video.py probe_media)
+    duration_seconds = Column(Float, nullable=True)
+    video_codec = Column(String(32), nullable=True)
+    audio_codec = Column(String(32), nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    bitrate = Column(Integer, nullable=True)
     status = Column(String, default="pending")
-    external_job_id = Column(String, nullable=True)
+    external_job_id = Column(String, nullable=True, index=True)
     error_log = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # NOT NULL: it is the pagination key (legacy NULLs backfilled in backend_pre_start)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Index, LargeBinary, func, Enum as SQLEnum
+from sqlalchemy.orm import deferred
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 import enum
@@ -11,13 +12,28 @@ class TrackStatus(str, enum.Enum):
     processing = "processing"
 
 class Track(Base):
+    __table_args__ = (
+        # Lists filter status == active (equality), so status can lead
+        Index("ix_tracks_status_uploaded_at", "status", "uploaded_at", "id"),
+        # Trigram indexes for search (needs the pg_trgm extension, see backend_pre_start)
+        Index("ix_tracks_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_tracks_artist_trgm", "artist", postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"}),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), unique=True, nullable=False)
     artist = Column(String(255), nullable=True)
     duration_seconds = Column(Integer, nullable=True)
+    audio_codec = Column(String(32), nullable=True)
+    bitrate = Column(Integer, nullable=True)
+    sample_rate = Column(Integer, nullable=True)
+    # int8 peak envelope (WAVEFORM_BUCKETS values), deferred so lists don't load it
+    waveform_peaks = deferred(Column(LargeBinary, nullable=True))
     file_path = Column(String, nullable=False)
     mimetype = Column(String(50), nullable=False)
     size_bytes = Column(BigInteger, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True) # sha256 of the file, objects are shared between equal hashes
     status = Column(SQLEnum(TrackStatus, name="track_status"), default=TrackStatus.processing)
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    # NOT NULL: it is the pagination key (legacy NULLs backfilled in backend_pre_start)
+    uploaded_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
     uploaded_by = Column(UUID(as_uuid=True), nullable=True)
@@ -1,13 +1,36 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Float, Integer, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.models.base import Base
 
 class Video(Base):
+    __table_args__ = (
+        # Serves the list query (status != 'deleted', newest first)
+        Index("ix_videos_created_at_active", "created_at", "id", postgresql_where=text("status != 'deleted'")),
+        # One live video per canonical URL, deleted ones can be re-added
+        Index(
+            "uq_videos_canonical_url_active",
+            "canonical_url",
+            unique=True,
+            postgresql_where=text("status != 'deleted'"),
+        ),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     original_url = Column(String, nullable=False)
+    canonical_url = Column(String, nullable=True) # see services/url_canonical.py
     file_path = Column(String, nullable=True)
     thumbnail_path = Column(String, nullable=True)
+    thumbnail_detail_path = Column(String, nullable=True)
+    sprite_path = Column(String, nullable=True)
+    # Filled from ffprobe (services/video.py probe_media)
+    duration_seconds = Column(Float, nullable=True)
+    video_codec = Column(String(32), nullable=True)
+    audio_codec = Column(String(32), nullable=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    bitrate = Column(Integer, nullable=True)
     status = Column(String, default="pending")
-    created_at = Column(DateTime, default=datetime.utcnow)
+    # NOT NULL: it is the pagination key (legacy NULLs backfilled in backend_pre_start)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
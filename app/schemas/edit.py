@@ -13,8 +13,13 @@ class EditResponse(BaseModel):
     video_id: Optional[UUID] = None
     track_id: UUID
     status: str
+    track_name: Optional[str] = None
+    track_artist: Optional[str] = None
+    motion_thumbnail_url: Optional[str] = None
     file_url: Optional[str] = None
     thumbnail_url: Optional[str] = None
+    thumbnail_detail_url: Optional[str] = None
+    sprite_url: Optional[str] = None
 
     class Config:
         from_attributes = True
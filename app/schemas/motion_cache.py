@@ -15,6 +15,8 @@ class MotionCacheBase(BaseModel):
     reference_id: UUID
     motion_video_url: Optional[str] = None
     motion_thumbnail_url: Optional[str] = None
+    motion_thumbnail_detail_url: Optional[str] = None
+    motion_sprite_url: Optional[str] = None
     status: JobStatus = JobStatus.PENDING
     external_job_id: Optional[str] = None
     error_log: Optional[str] = None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from uuid import UUID
-from typing import Optional
+from typing import List, Optional
 
 class TrackBase(BaseModel):
     name: str
@@ -17,3 +17,8 @@ class TrackResponse(TrackBase):
 
     class Config:
         from_attributes = True
+
+class TrackPeaks(BaseModel):
+    track_id: UUID
+    buckets: int
+    peaks: List[int] # 0..127, max amplitude per bucket
@@ -12,6 +12,8 @@ class VideoResponse(BaseModel):
     status: str
     file_url: Optional[str] = None
     thumbnail_url: Optional[str] = None
+    thumbnail_detail_url: Optional[str] = None
+    sprite_url: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -0,0 +1,147 @@
+import copy
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import yt_dlp
+
+from app.core.config import settings
+from app.services.url_canonical import canonicalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class VideoDownloader:
+    """
+    Worker-level yt-dlp wrapper. One YoutubeDL instance is kept per process
+    (extractors and HTTP handlers are set up once), extracted metadata is cached
+    by canonical URL for a short TTL, and download throughput is tracked in `stats()`.
+    """
+
+    def __init__(self):
+        self._ydl = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._info_cache = OrderedDict()
+        self._stats = {
+            "downloads": 0,
+            "failures": 0,
+            "bytes": 0,
+            "seconds": 0.0,
+            "info_cache_hits": 0,
+            "info_cache_misses": 0,
+        }
+
+    def _format_selector(self) -> str:
+        # Cap the rendition, a motion reference does not need 4K
+        heights = [f"[height<={settings.YTDLP_MAX_HEIGHT}]", ""] if settings.YTDLP_MAX_HEIGHT else [""]
+        # Prefer renditions known to fit the size cap, so an oversized best falls
+        # back to a smaller one instead of being aborted by max_filesize
+        sizes = [""]
+        if settings.YTDLP_MAX_FILESIZE_MB:
+            limit = settings.YTDLP_MAX_FILESIZE_MB * 1024 * 1024
+            sizes = [f"[filesize<{limit}]", f"[filesize_approx<{limit}]", ""]
+        return "/".join(
+            f"best{ext}{height}{size}"
+            for size in sizes
+            for height in heights
+            for ext in ("[ext=mp4]", "")
+        )
+
+    def _get_ydl(self) -> yt_dlp.YoutubeDL:
+        # Celery prefork children must not share the parent's instance/sockets
+        if self._ydl is None or self._pid != os.getpid():
+            opts = {
+                'format': settings.YTDLP_FORMAT or self._format_selector(),
+                'quiet': True,
+                'no_warnings': True,
+                # 'cookiefile': 'cookies.txt', # Might be needed for some regions/videos
+            }
+            if settings.YTDLP_MAX_FILESIZE_MB:
+                opts['max_filesize'] = settings.YTDLP_MAX_FILESIZE_MB * 1024 * 1024
+            self._ydl = yt_dlp.YoutubeDL(opts)
+            self._pid = os.getpid()
+            self._info_cache.clear()
+        return self._ydl
+
+    def extract_info(self, url: str) -> dict:
+        """Unprocessed extractor result for `url`, cached for YTDLP_INFO_CACHE_TTL seconds."""
+        # Keyed like Video.canonical_url, so URL flavours of one video share an entry
+        key = canonicalize_url(url)
+        now = time.monotonic()
+        with self._lock:
+            ydl = self._get_ydl()
+            cached = self._info_cache.get(key)
+            if cached and now - cached[0] < settings.YTDLP_INFO_CACHE_TTL:
+                self._info_cache.move_to_end(key)
+                self._stats["info_cache_hits"] += 1
+                return copy.deepcopy(cached[1])
+
+            self._stats["info_cache_misses"] += 1
+            info = ydl.extract_info(url, download=False, process=False)
+            self._info_cache[key] = (now, info)
+            while len(self._info_cache) > settings.YTDLP_INFO_CACHE_SIZE:
+                self._info_cache.popitem(last=False)
+            return copy.deepcopy(info)
+
+    def _count_failure(self, url: str) -> None:
+        with self._lock:
+            self._stats["failures"] += 1
+            # Stale signed media URLs are a common failure, do not reuse them
+            self._info_cache.pop(canonicalize_url(url), None)
+
+    def download(self, url: str, output_path: str) -> Optional[str]:
+        """
+        Download `url` to `output_path` and return the path of the file written
+        (yt-dlp may change the extension when merging). Returns None if nothing
+        was written (e.g. every rendition was over max_filesize).
+        """
+        try:
+            info = self.extract_info(url)
+            started = time.monotonic()
+            with self._lock:
+                ydl = self._get_ydl()
+                ydl.params['outtmpl'] = {'default': output_path}
+                ydl.process_ie_result(info, download=True)
+        except Exception:
+            self._count_failure(url)
+            raise
+
+        path = output_path
+        if not os.path.exists(path):
+            # Look for any file yt-dlp created next to the requested one
+            folder = os.path.dirname(output_path)
+            files = os.listdir(folder) if os.path.isdir(folder) else []
+            if not files:
+                self._count_failure(url)
+                logger.warning(f"Nothing was downloaded from {url}")
+                return None
+            path = os.path.join(folder, files[0])
+
+        elapsed = time.monotonic() - started
+        size = os.path.getsize(path)
+        with self._lock:
+            self._stats["downloads"] += 1
+            self._stats["bytes"] += size
+            self._stats["seconds"] += elapsed
+        logger.info(f"Downloaded {size / (1024 * 1024):.1f} MB in {elapsed:.2f}s ({size / max(elapsed, 1e-6) / (1024 * 1024):.2f} MB/s) from {url}")
+        stats = self.stats()
+        logger.info(
+            f"Downloader totals: {stats['downloads']} ok, {stats['failures']} failed, "
+            f"{stats['mb_per_second']:.2f} MB/s, info cache hit ratio {stats['info_cache_hit_ratio']:.0%}"
+        )
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = dict(self._stats)
+        result["mb_per_second"] = result["bytes"] / max(result["seconds"], 1e-6) / (1024 * 1024) if result["seconds"] else 0.0
+        lookups = result["info_cache_hits"] + result["info_cache_misses"]
+        result["info_cache_hit_ratio"] = result["info_cache_hits"] / lookups if lookups else 0.0
+        return result
+
+
+downloader = VideoDownloader()
@@ -0,0 +1,165 @@
+import fcntl
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from app.core.config import settings
+from app.services.minio_client import minio_client
+
+logger = logging.getLogger(__name__)
+
+LOCK_SUFFIX = ".lock"
+PART_SUFFIX = ".part"
+
+
+class MediaCache:
+    """
+    On-disk LRU cache of MinIO objects shared by all worker processes on a host.
+    Entries are keyed by bucket/object/ETag, so an overwritten object is never
+    served stale. Each entry has a lock file: fetching holds it exclusively,
+    readers hold it shared, and eviction skips entries that are in use.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._stats = {"hits": 0, "misses": 0, "bytes_fetched": 0, "evictions": 0}
+
+    def _entry_path(self, bucket_name: str, object_name: str, etag: str) -> str:
+        key = hashlib.sha256(f"{bucket_name}/{object_name}/{etag}".encode()).hexdigest()
+        return os.path.join(self.root, key + os.path.splitext(object_name)[1])
+
+    @contextmanager
+    def _locked(self, lock_path: str, operation: int):
+        """
+        flock `lock_path` with `operation`. evict() unlinks the lock file of an
+        entry it removes, so once locked, check the file held is still the one
+        at `lock_path` and start over otherwise.
+        """
+        while True:
+            lock = open(lock_path, "a+")
+            try:
+                fcntl.flock(lock, operation)
+                try:
+                    current = os.stat(lock_path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(lock.fileno()).st_ino:
+                    break
+            except BaseException:
+                lock.close()
+                raise
+            lock.close()
+        try:
+            yield lock
+        finally:
+            lock.close() # releases the flock
+
+    @contextmanager
+    def fetch(self, bucket_name: str, object_name: str):
+        """
+        Yield a local path holding the object, downloading it on a miss.
+        The file is guaranteed to stay in place until the block exits.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        stat = minio_client.stat_object(bucket_name, object_name)
+        path = self._entry_path(bucket_name, object_name, stat.etag)
+        lock_path = path + LOCK_SUFFIX
+        missed = False
+
+        while True:
+            # Readers hold the shared lock from the existence check until the
+            # block exits, so evict() can't remove the file in between
+            with self._locked(lock_path, fcntl.LOCK_SH):
+                if os.path.exists(path):
+                    if missed:
+                        self._stats["bytes_fetched"] += stat.size
+                    else:
+                        self._stats["hits"] += 1
+                        os.utime(path) # mtime is the LRU clock
+                    logger.info(f"Media cache {'miss' if missed else 'hit'} for {bucket_name}/{object_name} ({self.stats()})")
+                    yield path
+                    break
+
+            # Miss (or evicted since the download): fetch under the exclusive
+            # lock, then go back to reading it under the shared one
+            with self._locked(lock_path, fcntl.LOCK_EX):
+                if not os.path.exists(path):
+                    if not missed:
+                        self._stats["misses"] += 1
+                    missed = True
+                    part = f"{path}{PART_SUFFIX}{os.getpid()}"
+                    try:
+                        minio_client.download_file(bucket_name, object_name, part)
+                        os.replace(part, path)
+                    finally:
+                        if os.path.exists(part):
+                            os.remove(part)
+
+        if missed:
+            self.evict()
+
+    @contextmanager
+    def fetch_many(self, objects):
+        """fetch() several (bucket, object) pairs concurrently, yields their paths in order."""
+        with ExitStack() as stack, ThreadPoolExecutor(max_workers=max(1, len(objects))) as pool:
+            futures = [pool.submit(stack.enter_context, self.fetch(bucket_name, object_name)) for bucket_name, object_name in objects]
+            yield [future.result() for future in futures]
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits its budget, along
+        with their lock files and lock files left without an entry.
+        """
+        try:
+            entries = []
+            orphan_locks = []
+            for name in os.listdir(self.root):
+                full = os.path.join(self.root, name)
+                if name.endswith(LOCK_SUFFIX):
+                    if not os.path.exists(full[:-len(LOCK_SUFFIX)]):
+                        orphan_locks.append(full)
+                    continue
+                if PART_SUFFIX in name:
+                    continue
+                st = os.stat(full)
+                entries.append((st.st_mtime, st.st_size, full))
+        except OSError as e:
+            logger.warning(f"Media cache scan failed: {e}")
+            return
+
+        for lock_path in orphan_locks:
+            self._remove_unused(None, lock_path)
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self._remove_unused(full, full + LOCK_SUFFIX):
+                total -= size
+                self._stats["evictions"] += 1
+
+    def _remove_unused(self, path, lock_path: str) -> bool:
+        """Remove an entry and its lock file unless a reader/fetcher holds the lock."""
+        try:
+            with self._locked(lock_path, fcntl.LOCK_EX | fcntl.LOCK_NB):
+                if path is not None and os.path.exists(path):
+                    os.remove(path)
+                elif path is None and os.path.exists(lock_path[:-len(LOCK_SUFFIX)]):
+                    return False # fetched meanwhile, the lock is live again
+                os.remove(lock_path)
+                return path is not None
+        except BlockingIOError:
+            return False # in use
+        except OSError as e:
+            logger.warning(f"Media cache eviction of {lock_path} failed: {e}")
+            return False
+
+    def stats(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {**self._stats, "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0}
+
+
+media_cache = MediaCache(settings.MEDIA_CACHE_DIR, settings.MEDIA_CACHE_MAX_BYTES)
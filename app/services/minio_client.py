@@ -1,6 +1,23 @@
 from minio import Minio
 from app.core.config import settings
+from datetime import timedelta
 import io
+import threading
+import urllib3
+
+# Smallest part size S3/MinIO accepts for multipart uploads
+MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
+def _http_client() -> urllib3.PoolManager:
+    # One pool shared by every request of the process, sized for concurrent
+    # API threads / worker threads; transient 5xx are retried with backoff
+    return urllib3.PoolManager(
+        num_pools=4,
+        maxsize=settings.MINIO_POOL_SIZE,
+        timeout=urllib3.Timeout(connect=settings.MINIO_CONNECT_TIMEOUT, read=settings.MINIO_READ_TIMEOUT),
+        retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+        cert_reqs="CERT_REQUIRED" if settings.MINIO_SECURE else "CERT_NONE",
+    )
 
 class MinioClient:
     def __init__(self):
@@ -8,10 +25,40 @@ class MinioClient:
             settings.MINIO_URL,
             access_key=settings.MINIO_ACCESS_KEY,
             secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_SECURE
+            secure=settings.MINIO_SECURE,
+            region=settings.MINIO_REGION,
+            http_client=_http_client()
         )
+        # Signs URLs for the browser-facing endpoint; signing is offline, so the
+        # region is fixed to avoid a bucket-location lookup against that host
+        self.public_client = None
+        if settings.MINIO_PUBLIC_URL:
+            self.public_client = Minio(
+                settings.MINIO_PUBLIC_URL,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=settings.MINIO_PUBLIC_SECURE,
+                region=settings.MINIO_REGION
+            )
+        # Buckets known to exist, so uploads skip the bucket_exists round trip
+        self._known_buckets = set()
+        self._buckets_lock = threading.Lock()
 
     def ensure_bucket(self, bucket_name: str):
+        if bucket_name in self._known_buckets:
+            return
+        with self._buckets_lock:
+            if bucket_name in self._known_buckets:
+                return
+            self._create_bucket(bucket_name)
+            self._known_buckets.add(bucket_name)
+
+    def ensure_buckets(self):
+        """Create every configured bucket once, at startup."""
+        for bucket_name in ALL_BUCKETS:
+            self.ensure_bucket(bucket_name)
+
+    def _create_bucket(self, bucket_name: str):
         if not self.client.bucket_exists(bucket_name):
             self.client.make_bucket(bucket_name)
             # Set public policy for audio-tracks if needed, 
@@ -31,6 +78,19 @@ class MinioClient:
             content_type=content_type
         )
 
+    def put_stream(self, bucket_name: str, object_name: str, stream, content_type: str, part_size: int = MULTIPART_PART_SIZE):
+        # Unknown length: minio streams the data as a multipart upload,
+        # holding at most one part in memory at a time
+        self.ensure_bucket(bucket_name)
+        return self.client.put_object(
+            bucket_name,
+            object_name,
+            stream,
+            -1,
+            content_type=content_type,
+            part_size=part_size
+        )
+
     def get_url(self, bucket_name: str, object_name: str):
         # Return a direct URL assuming MinIO is accessible at MINIO_URL
         # In docker-compose internal network, MINIO_URL is 'minio:9000'. 
@@ -42,8 +102,9 @@ class MinioClient:
         # For now I will return the internal URL, but in real deploy verify reachability.
          return f"http://{settings.MINIO_URL}/{bucket_name}/{object_name}"
 
-    def get_presigned_url(self, bucket_name: str, object_name: str):
-        return self.client.get_presigned_url("GET", bucket_name, object_name)
+    def get_presigned_url(self, bucket_name: str, object_name: str, expires: timedelta = timedelta(days=7), public: bool = False):
+        client = self.public_client if public and self.public_client else self.client
+        return client.get_presigned_url("GET", bucket_name, object_name, expires=expires)
 
     def download_file(self, bucket_name: str, object_name: str, file_path: str):
         self.client.fget_object(bucket_name, object_name, file_path)
@@ -52,4 +113,19 @@ class MinioClient:
         self.ensure_bucket(bucket_name)
         self.client.fput_object(bucket_name, object_name, file_path, content_type=content_type)
 
+    def stat_object(self, bucket_name: str, object_name: str):
+        return self.client.stat_object(bucket_name, object_name)
+
+    def remove_object(self, bucket_name: str, object_name: str):
+        self.client.remove_object(bucket_name, object_name)
+
+ALL_BUCKETS = [
+    settings.MINIO_BUCKET_AUDIO,
+    settings.MINIO_BUCKET_TIKTOK,
+    settings.MINIO_BUCKET_PROCESSED,
+    settings.MINIO_BUCKET_AVATARS,
+    settings.MINIO_BUCKET_REFERENCES,
+    settings.MINIO_BUCKET_MOTIONS,
+]
+
 minio_client = MinioClient()
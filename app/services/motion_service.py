@@ -1,11 +1,35 @@
 import aiohttp
 import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import update
 from app.core.config import settings
+from app.models.motion_cache import MotionCache
+from app.schemas.motion_cache import JobStatus
 from fastapi import HTTPException
 import uuid
 
 logger = logging.getLogger(__name__)
 
+def expire_stale_motions(avatar_id, reference_id, now: Optional[datetime] = None):
+    """
+    UPDATE statement failing the in-flight generations of this pair that are
+    older than MOTION_INFLIGHT_TTL_MINUTES, so a lost one stops holding the
+    uq_motion_cache_inflight slot. Run it before claiming a new generation.
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(minutes=settings.MOTION_INFLIGHT_TTL_MINUTES)
+    return (
+        update(MotionCache)
+        .where(
+            MotionCache.avatar_id == avatar_id,
+            MotionCache.reference_id == reference_id,
+            MotionCache.status.in_([JobStatus.PENDING.value, JobStatus.PROCESSING.value]),
+            MotionCache.created_at < cutoff,
+        )
+        .values(status=JobStatus.FAILED.value, error_log="Generation timed out")
+        .execution_options(synchronize_session=False)
+    )
+
 async def request_motion_generation(avatar_url: str, ref_url: str) -> str:
     if not settings.KIE_API_KEY:
         logger.warning("KIE_API_KEY is missing")
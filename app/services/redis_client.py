@@ -0,0 +1,4 @@
+import redis
+from app.core.config import settings
+
+redis_client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
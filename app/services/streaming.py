@@ -0,0 +1,52 @@
+import hashlib
+from typing import BinaryIO, Optional
+
+
+class TeeReader:
+    """
+    File-like wrapper that copies everything read from `source` into `sink`.
+    Lets a single pass over an HTTP body feed a MinIO upload and a local file.
+    """
+
+    def __init__(self, source: BinaryIO, sink: Optional[BinaryIO] = None):
+        self.source = source
+        self.sink = sink
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if data:
+            self.bytes_read += len(data)
+            if self.sink is not None:
+                self.sink.write(data)
+        return data
+
+
+class FileTooLargeError(Exception):
+    pass
+
+
+class LimitedHashingReader:
+    """
+    File-like wrapper that hashes the data as it is read and aborts with
+    FileTooLargeError as soon as more than `max_size` bytes came through.
+    """
+
+    def __init__(self, source: BinaryIO, max_size: Optional[int] = None):
+        self.source = source
+        self.max_size = max_size
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if data:
+            self.size += len(data)
+            if self.max_size is not None and self.size > self.max_size:
+                raise FileTooLargeError(f"File exceeds {self.max_size} bytes")
+            self._sha256.update(data)
+        return data
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
@@ -0,0 +1,38 @@
+from sqlalchemy import case, func, or_
+from app.models.track import Track
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_tracks(query, term: str, limit: int):
+    """
+    Ranked track search backed by the pg_trgm GIN indexes on name/artist.
+    Matches substrings (ILIKE, index-accelerated by trigrams) and fuzzy
+    trigram similarity; prefix matches rank first, then by similarity.
+    """
+    term = term.strip()
+    pattern = f"%{escape_like(term)}%"
+    prefix = f"{escape_like(term)}%"
+    artist = func.coalesce(Track.artist, "")
+
+    rank = func.greatest(func.similarity(Track.name, term), func.similarity(artist, term))
+    is_prefix = case(
+        (or_(Track.name.ilike(prefix, escape="\\"), artist.ilike(prefix, escape="\\")), 1),
+        else_=0,
+    )
+
+    return (
+        query.filter(
+            or_(
+                Track.name.ilike(pattern, escape="\\"),
+                Track.artist.ilike(pattern, escape="\\"),
+                Track.name.op("%")(term),
+                Track.artist.op("%")(term),
+            )
+        )
+        .order_by(is_prefix.desc(), rank.desc(), Track.uploaded_at.desc())
+        .limit(limit)
+        .all()
+    )
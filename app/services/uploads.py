@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import UploadFile
+
+from app.services.minio_client import minio_client
+from app.services.streaming import LimitedHashingReader
+
+
+@dataclass
+class StoredUpload:
+    size: int
+    sha256: str
+
+
+def store_upload(file: UploadFile, bucket_name: str, object_name: str, max_size: Optional[int] = None) -> StoredUpload:
+    """
+    Stream an UploadFile into MinIO as a multipart upload, enforcing the size
+    limit and hashing on the fly. Raises FileTooLargeError past `max_size`.
+    Blocking: call from a sync endpoint or through run_in_threadpool.
+    """
+    file.file.seek(0)
+    reader = LimitedHashingReader(file.file, max_size)
+    minio_client.put_stream(
+        bucket_name,
+        object_name,
+        reader,
+        content_type=file.content_type or "application/octet-stream"
+    )
+    return StoredUpload(size=reader.size, sha256=reader.sha256)
+
+
+def discard_object(bucket_name: str, object_name: str):
+    """Best-effort removal of an object that turned out to be unneeded."""
+    try:
+        minio_client.remove_object(bucket_name, object_name)
+    except Exception:
+        pass
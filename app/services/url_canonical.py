@@ -0,0 +1,105 @@
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Optional
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Hosts that only redirect to the real video page
+SHORT_LINK_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+SHORT_LINK_PATHS = {"tiktok.com": re.compile(r"^/t/")}
+
+# Video-ID extraction for known hosts: (host suffix, pattern on path, key prefix)
+VIDEO_ID_PATTERNS = [
+    ("tiktok.com", re.compile(r"^/(?:@[^/]+/video|v|embed(?:/v2)?|share/video)/(\d+)"), "tiktok"),
+    ("youtube.com", re.compile(r"^/(?:shorts|embed|live)/([\w-]{11})"), "youtube"),
+    ("youtu.be", re.compile(r"^/([\w-]{11})"), "youtube"),
+    ("instagram.com", re.compile(r"^/(?:[^/]+/)?(?:p|reel|reels|tv)/([\w-]+)"), "instagram"),
+]
+
+# Query parameters that never change which video a URL points to
+TRACKING_PARAMS = re.compile(r"^(utm_|_r$|_t$|is_from_webapp$|sender_device$|share_|igsh$|igshid$|si$|feature$|lang$)")
+
+
+def _host(parts) -> str:
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+def is_short_link(url: str) -> bool:
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host in SHORT_LINK_HOSTS:
+        return True
+    pattern = SHORT_LINK_PATHS.get(_host(parts))
+    return bool(pattern and pattern.match(parts.path))
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Stable dedup key for a video URL. Known hosts map to `<site>:<video id>`
+    whatever the URL flavour (desktop, mobile, embed, query params); other URLs
+    are normalized (scheme, host case, www/m. prefix, tracking params, fragment).
+    """
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    parts = urlsplit(url)
+    host = _host(parts)
+    path = parts.path.rstrip("/") or "/"
+
+    for suffix, pattern, site in VIDEO_ID_PATTERNS:
+        if host == suffix or host.endswith("." + suffix):
+            match = pattern.match(path)
+            if match:
+                return f"{site}:{match.group(1)}"
+
+    if host.endswith("youtube.com") and path == "/watch":
+        video_id = parse_qs(parts.query).get("v", [None])[0]
+        if video_id:
+            return f"youtube:{video_id}"
+
+    query = urlencode(sorted(
+        (k, v) for k, values in parse_qs(parts.query, keep_blank_values=True).items() for v in values
+        if not TRACKING_PARAMS.match(k)
+    ))
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def resolve_short_link(url: str, timeout: float = 5.0) -> str:
+    """Follow redirects of a share link to the real video URL; returns `url` on failure."""
+    try:
+        resp = requests.head(url.strip(), allow_redirects=True, timeout=timeout)
+        return resp.url or url
+    except Exception as e:
+        logger.warning(f"Could not resolve short link {url}: {e}")
+        return url
+
+
+def canonicalize_urls(urls: Iterable[str], max_workers: int = 8, budget: Optional[float] = None) -> Dict[str, str]:
+    """
+    Canonicalize many URLs, resolving short links concurrently. Blocking, for
+    at most `budget` seconds if given: short links not resolved by then are
+    keyed by their normalized URL instead of waiting on slow redirects.
+    """
+    urls = list(dict.fromkeys(urls))
+    short = [u for u in urls if is_short_link(u)]
+    resolved = {}
+    if short:
+        pool = ThreadPoolExecutor(max_workers=min(max_workers, len(short)))
+        try:
+            futures = {pool.submit(resolve_short_link, u): u for u in short}
+            done, pending = wait(futures, timeout=budget)
+            resolved = {futures[f]: f.result() for f in done}
+            if pending:
+                logger.warning(f"Short link resolution budget exceeded, {len(pending)} links left unresolved")
+        finally:
+            # Don't wait for HEAD requests still running past the budget
+            pool.shutdown(wait=False, cancel_futures=True)
+    return {u: canonicalize_url(resolved.get(u, u)) for u in urls}
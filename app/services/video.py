@@ -1,32 +1,191 @@
 import subprocess
 import os
-import tempfile
+import json
 import logging
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-def generate_thumbnail(video_path: str) -> str:
-    temp_thumb = tempfile.mktemp(suffix=".jpg")
+@dataclass
+class ThumbnailSet:
+    grid: str # small still for list views
+    detail: str # larger still for detail views
+    sprite: Optional[str] = None # SPRITE_COLUMNS x SPRITE_ROWS hover-scrub sheet
+    sprite_content_type: str = "image/jpeg"
+
+def generate_thumbnails(video_path: str, output_dir: str, duration: Optional[float] = None) -> Optional[ThumbnailSet]:
+    """
+    Produce the list-grid and detail stills plus the hover-scrub sprite sheet
+    in one ffmpeg run. Stills use input seeking (-ss before -i) so only the
+    frames around the seek point are decoded; the sprite reads keyframes only.
+    """
+    if duration is None:
+        info = probe_media(video_path)
+        duration = info.duration if info else 0.0
+
+    seek = min(1.0, duration / 2) if duration > 0 else 0.0
+    cols, rows = settings.SPRITE_COLUMNS, settings.SPRITE_ROWS
+    sprite_ext = "webp" if settings.SPRITE_FORMAT == "webp" else "jpg"
+
+    thumbs = ThumbnailSet(
+        grid=os.path.join(output_dir, "thumb_grid.jpg"),
+        detail=os.path.join(output_dir, "thumb_detail.jpg"),
+        sprite=os.path.join(output_dir, f"sprite.{sprite_ext}") if duration > 0 else None,
+        sprite_content_type=f"image/{'webp' if sprite_ext == 'webp' else 'jpeg'}",
+    )
+
+    cmd = ["ffmpeg", "-y", "-v", "error", "-ss", f"{seek:.3f}", "-i", video_path]
+    graph = (
+        f"[0:v]split=2[g][d];"
+        f"[g]scale={settings.THUMBNAIL_GRID_WIDTH}:-2[grid];"
+        f"[d]scale={settings.THUMBNAIL_DETAIL_WIDTH}:-2[detail]"
+    )
+    if thumbs.sprite:
+        cmd += ["-skip_frame", "nokey", "-i", video_path]
+        fps = cols * rows / duration
+        graph += f";[1:v]fps={fps:.6f},scale={settings.SPRITE_FRAME_WIDTH}:-2,tile={cols}x{rows}[sprite]"
+    cmd += ["-filter_complex", graph,
+            "-map", "[grid]", "-frames:v", "1", "-q:v", "3", thumbs.grid,
+            "-map", "[detail]", "-frames:v", "1", "-q:v", "2", thumbs.detail]
+    if thumbs.sprite:
+        cmd += ["-map", "[sprite]", "-frames:v", "1", "-q:v", "5", thumbs.sprite]
+
     try:
-        subprocess.check_call([
-            "ffmpeg", "-i", video_path, "-ss", "00:00:01", "-vframes", "1", 
-            "-q:v", "2", "-y", temp_thumb
-        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        if os.path.exists(temp_thumb):
-            return temp_thumb
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300)
     except Exception as e:
         logger.error(f"Thumbnail generation failed: {e}")
-    return None
+        return None
+
+    if not (os.path.exists(thumbs.grid) and os.path.exists(thumbs.detail)):
+        return None
+    if thumbs.sprite and not os.path.exists(thumbs.sprite):
+        thumbs.sprite = None
+    return thumbs
+
+@dataclass
+class MediaInfo:
+    duration: float = 0.0
+    format_name: Optional[str] = None
+    bitrate: Optional[int] = None
+    video_codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    audio_codec: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
 
-def get_video_duration(video_path: str) -> float:
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def probe_media(source: str) -> Optional[MediaInfo]:
+    """
+    Read container and stream metadata with a single ffprobe call. `source` can be
+    a local path or an http(s) URL (e.g. a presigned MinIO URL): ffprobe only
+    fetches the headers it needs, nothing is decoded.
+    """
     try:
         result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+            ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", source],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            text=True
+            text=True,
+            timeout=60
         )
-        return float(result.stdout.strip())
+        data = json.loads(result.stdout or "{}")
     except Exception as e:
-        logger.error(f"Failed to get video duration: {e}")
-        return 0.0
+        logger.error(f"Failed to probe media: {e}")
+        return None
+
+    fmt = data.get("format") or {}
+    if not fmt:
+        logger.error(f"ffprobe returned no format info: {result.stderr.strip()}")
+        return None
+
+    info = MediaInfo(
+        duration=float(fmt.get("duration") or 0.0),
+        format_name=fmt.get("format_name"),
+        bitrate=_to_int(fmt.get("bit_rate")),
+    )
+    for stream in data.get("streams", []):
+        if stream.get("codec_type") == "video" and info.video_codec is None:
+            # Cover art in audio files shows up as a single-frame video stream
+            if (stream.get("disposition") or {}).get("attached_pic"):
+                continue
+            info.video_codec = stream.get("codec_name")
+            info.width = _to_int(stream.get("width"))
+            info.height = _to_int(stream.get("height"))
+        elif stream.get("codec_type") == "audio" and info.audio_codec is None:
+            info.audio_codec = stream.get("codec_name")
+            info.sample_rate = _to_int(stream.get("sample_rate"))
+            info.channels = _to_int(stream.get("channels"))
+    return info
+
+# Video codecs that can be stream-copied into an MP4 container as-is
+MP4_COPYABLE_VIDEO_CODECS = {"h264", "hevc", "mpeg4", "av1"}
+
+def replace_audio(video_path: str, audio_path: str, output_path: str) -> bool:
+    """
+    Swap the audio track of a video, trimming the audio to the video duration.
+    The video bitstream is stream-copied when the codec fits in MP4, so only the
+    audio gets encoded; otherwise falls back to a full libx264 re-encode.
+    """
+    info = probe_media(video_path) or MediaInfo()
+    duration = info.duration
+    base_cmd = ["ffmpeg", "-y", "-i", video_path, "-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    # Audio shorter than the video is kept as is, longer audio is cut at the video end
+    tail = ["-c:a", "aac", "-b:a", "192k"]
+    if duration > 0:
+        tail += ["-t", f"{duration:.3f}"]
+    tail += ["-movflags", "+faststart", output_path]
+
+    if info.video_codec in MP4_COPYABLE_VIDEO_CODECS:
+        try:
+            subprocess.check_call(base_cmd + ["-c:v", "copy"] + tail, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return True
+        except Exception as e:
+            logger.warning(f"Stream copy failed, falling back to re-encode: {e}")
+
+    try:
+        subprocess.check_call(
+            base_cmd + ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"] + tail,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        return True
+    except Exception as e:
+        logger.error(f"Audio replacement failed: {e}")
+    return False
+
+def compute_waveform_peaks(source: str, buckets: int = 2000, sample_rate: int = 8000) -> Optional[bytes]:
+    """
+    Downsampled peak envelope of an audio file: `buckets` int8 values (0..127),
+    each the max absolute amplitude of its slice. ffmpeg decodes to low-rate mono
+    PCM and the reduction is vectorized in NumPy. `source` may be a URL.
+    """
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-v", "error", "-i", source, "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=300
+        )
+        samples = np.frombuffer(result.stdout, dtype="<i2")
+    except Exception as e:
+        logger.error(f"Waveform decoding failed: {e}")
+        return None
+
+    if samples.size == 0:
+        logger.error(f"Waveform decoding produced no samples: {result.stderr.decode(errors='ignore').strip()}")
+        return None
+
+    # Pad to a whole number of buckets, then take the max |sample| per row
+    per_bucket = -(-samples.size // buckets)
+    padded = np.zeros(per_bucket * buckets, dtype=np.int32)
+    padded[:samples.size] = samples
+    peaks = np.abs(padded.reshape(buckets, per_bucket)).max(axis=1)
+    return (peaks * 127 // 32768).astype(np.int8).tobytes()
@@ -0,0 +1,61 @@
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspaceFullError(Exception):
+    pass
+
+
+class Workspace:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, name: str) -> str:
+        """Path for a file inside the workspace (basename only, no traversal)."""
+        return os.path.join(self.root, os.path.basename(name))
+
+
+def _free_bytes(path: str) -> int:
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return 0
+
+
+def _pick_base_dir(expected_bytes: int) -> str:
+    base = settings.WORKSPACE_DIR or tempfile.gettempdir()
+    os.makedirs(base, exist_ok=True)
+
+    # Prefer RAM-backed tmpfs when the job comfortably fits
+    tmpfs = settings.WORKSPACE_TMPFS_DIR
+    if tmpfs and expected_bytes and os.path.isdir(tmpfs) and expected_bytes <= settings.WORKSPACE_TMPFS_MAX_BYTES:
+        if _free_bytes(tmpfs) >= expected_bytes * 2:
+            return tmpfs
+
+    needed = expected_bytes + settings.WORKSPACE_RESERVE_BYTES
+    if _free_bytes(base) < needed:
+        raise WorkspaceFullError(f"Not enough disk space in {base} for a {expected_bytes} byte job")
+    return base
+
+
+@contextmanager
+def job_workspace(job_name: str, expected_bytes: Optional[int] = None):
+    """
+    Private scratch directory for one job, removed on exit whatever happens.
+    Jobs never share paths, so a worker can run several tasks concurrently.
+    Raises WorkspaceFullError when the disk can't hold `expected_bytes`.
+    """
+    base = _pick_base_dir(expected_bytes or 0)
+    root = tempfile.mkdtemp(prefix=f"job-{job_name}-", dir=base)
+    try:
+        yield Workspace(root)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
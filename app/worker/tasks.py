@@ -4,14 +4,45 @@ from app.models.track import Track, TrackStatus
 from app.models.video import Video
 from app.models.motion_cache import MotionCache
 from app.models.edit import Edit, EditStatus
+from app.schemas.motion_cache import JobStatus
 from app.services.minio_client import minio_client
-from app.services.video import generate_thumbnail
+from app.services.streaming import TeeReader
+from app.services.downloader import downloader
+from app.services.workspace import job_workspace
+from app.services.media_cache import media_cache
+from app.services.video import generate_thumbnails, replace_audio, probe_media, compute_waveform_peaks, MediaInfo, ThumbnailSet
 from app.core.config import settings
 import uuid
 import os
-import tempfile
-from pydub import AudioSegment
-import yt_dlp
+from contextlib import nullcontext
+import requests
+
+def apply_media_info(obj, info: MediaInfo):
+    # Copy probed fields onto whichever of them the model has
+    fields = {
+        "duration_seconds": info.duration,
+        "video_codec": info.video_codec,
+        "audio_codec": info.audio_codec,
+        "width": info.width,
+        "height": info.height,
+        "bitrate": info.bitrate,
+        "sample_rate": info.sample_rate,
+    }
+    for name, value in fields.items():
+        if hasattr(obj, name) and value is not None:
+            setattr(obj, name, value)
+
+def upload_thumbnails(thumbs: ThumbnailSet, bucket_name: str, key: str):
+    """Upload a ThumbnailSet, returns the (grid, detail, sprite) object names."""
+    grid_name = f"thumb_{key}.jpg"
+    detail_name = f"thumb_{key}_detail.jpg"
+    minio_client.upload_file(bucket_name, grid_name, thumbs.grid, "image/jpeg")
+    minio_client.upload_file(bucket_name, detail_name, thumbs.detail, "image/jpeg")
+    sprite_name = None
+    if thumbs.sprite:
+        sprite_name = f"sprite_{key}{os.path.splitext(thumbs.sprite)[1]}"
+        minio_client.upload_file(bucket_name, sprite_name, thumbs.sprite, thumbs.sprite_content_type)
+    return grid_name, detail_name, sprite_name
 
 def get_db():
     db = SessionLocal()
@@ -28,24 +59,18 @@ def process_track_task(track_id: str):
         if not track:
             return "Track not found"
         
-        # Download from MinIO to temp file for analysis
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(track.file_path)[1]) as tmp:
-            minio_client.download_file(settings.MINIO_BUCKET_AUDIO, track.file_path, tmp.name)
-            tmp_path = tmp.name
-        
-        try:
-            audio = AudioSegment.from_file(tmp_path)
-            duration_s = len(audio) / 1000.0
-            track.duration_seconds = int(duration_s)
+        # Probe straight from MinIO through a presigned URL, no local copy needed
+        url = minio_client.get_presigned_url(settings.MINIO_BUCKET_AUDIO, track.file_path)
+        info = probe_media(url)
+        if info and info.duration > 0:
+            apply_media_info(track, info)
+            track.duration_seconds = int(info.duration)
+            track.waveform_peaks = compute_waveform_peaks(url, settings.WAVEFORM_BUCKETS)
             track.status = TrackStatus.active
-            db.commit()
-        except Exception as e:
+        else:
             track.status = TrackStatus.inactive # Or failed
-            db.commit()
-            print(f"Error processing audio: {e}")
-        finally:
-             if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+            print(f"Error processing audio: could not probe {track.file_path}")
+        db.commit()
     finally:
         db.close()
 
@@ -59,66 +84,65 @@ def download_video_task(video_id: str):
         
         file_name = f"video_{video_id}.mp4"
         
-        # Use yt-dlp to download
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_path = os.path.join(temp_dir, file_name)
-            
-            ydl_opts = {
-                'format': 'best[ext=mp4]/best',  # Prefer mp4
-                'outtmpl': temp_path,
-                'quiet': True,
-                'no_warnings': True,
-                # 'cookiefile': 'cookies.txt', # Might be needed for some regions/videos
-            }
-            
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([video.original_url])
-                
-                # Verify file exists (yt-dlp might change extension if merged)
-                # But outtmpl with exact name usually holds if format matches.
-                # If not found, look for any file in temp_dir
-                if not os.path.exists(temp_path):
-                    files = os.listdir(temp_dir)
-                    if files:
-                        temp_path = os.path.join(temp_dir, files[0])
-                    else:
-                        raise Exception("Download failed, no file created")
+        try:
+            # Inside the try: a full disk must fail the video, not leave it pending
+            with job_workspace(f"download-{video_id}") as ws:
+                temp_dir = ws.root
+                temp_path = ws.path(file_name)
+
+                # Use the process-wide yt-dlp downloader
+                temp_path = downloader.download(video.original_url, temp_path)
+                if not temp_path:
+                    raise Exception("Download failed, no file created")
 
                 minio_client.upload_file(settings.MINIO_BUCKET_TIKTOK, file_name, temp_path, "video/mp4")
                 video.file_path = file_name
+
+                info = probe_media(temp_path)
+                if info:
+                    apply_media_info(video, info)
                 
-                # Generate and upload thumbnail
-                thumb_path = generate_thumbnail(temp_path)
-                if thumb_path:
-                    thumb_name = f"thumb_{video_id}.jpg"
-                    minio_client.upload_file(settings.MINIO_BUCKET_TIKTOK, thumb_name, thumb_path, "image/jpeg")
-                    video.thumbnail_path = thumb_name
-                    try:
-                        os.remove(thumb_path)
-                    except: pass
+                # Generate and upload thumbnails + preview sprite
+                thumbs = generate_thumbnails(temp_path, temp_dir, info.duration if info else None)
+                if thumbs:
+                    video.thumbnail_path, video.thumbnail_detail_path, video.sprite_path = upload_thumbnails(
+                        thumbs, settings.MINIO_BUCKET_TIKTOK, str(video_id)
+                    )
                 
                 video.status = "downloaded"
                 db.commit()
-            except Exception as e:
-                video.status = "failed"
-                db.commit()
-                print(f"Error downloading video: {e}")
+        except Exception as e:
+            video.status = "failed"
+            db.commit()
+            print(f"Error downloading video: {e}")
     finally:
         db.close()
 
+def enqueue_video_downloads(video_ids: list):
+    """
+    Dispatch downloads for a batch of videos with at most
+    REFERENCE_DOWNLOAD_CONCURRENCY of them in flight: the ids are split into that
+    many chunks, each chunk is one task that downloads its videos in sequence.
+    """
+    if not video_ids:
+        return
+    parallel = max(1, settings.REFERENCE_DOWNLOAD_CONCURRENCY)
+    chunk_size = -(-len(video_ids) // parallel)
+    download_video_task.chunks([(video_id,) for video_id in video_ids], chunk_size).apply_async()
+
 @celery_app.task
 def process_edit_task(edit_id: str):
     db = SessionLocal()
     try:
         edit = db.query(Edit).filter(Edit.id == edit_id).first()
-        if not edit:
+        # Failed meanwhile (e.g. expired by EDIT_INFLIGHT_TTL_MINUTES): a newer
+        # edit may own the render slot now
+        if not edit or edit.status == EditStatus.failed:
             return
         
         edit.status = EditStatus.processing
         db.commit()
 
-        video_local = None
         video_filename = None
         bucket_name = None
 
@@ -159,75 +183,106 @@ def process_edit_task(edit_id: str):
             db.commit()
             return
 
-        # Download both files
-        video_local = f"/tmp/{video_filename}"
-        track_local = f"/tmp/{track.file_path}"
-        output_local = f"/tmp/out_{edit.id}.mp4"
-
         try:
-            minio_client.download_file(bucket_name, video_filename, video_local)
-            minio_client.download_file(settings.MINIO_BUCKET_AUDIO, track.file_path, track_local)
+            # Acquire both inputs at once: either fetched concurrently through the
+            # worker's media cache, or handed to ffmpeg as presigned URLs
+            sources = [(bucket_name, video_filename), (settings.MINIO_BUCKET_AUDIO, track.file_path)]
+            if settings.EDIT_SOURCE_MODE == "url":
+                acquire = nullcontext([minio_client.get_presigned_url(b, o) for b, o in sources])
+            else:
+                acquire = media_cache.fetch_many(sources)
 
+            with acquire as (video_local, track_local):
+                expected = os.path.getsize(video_local) if os.path.exists(video_local) else None
+                with job_workspace(f"edit-{edit.id}", expected) as ws:
+                    output_local = ws.path(f"out_{edit.id}.mp4")
 
-            # EDITING LOGIC using moviepy
-            # Note: This requires ffmpeg installed in the worker container
-            from moviepy import VideoFileClip, AudioFileClip
-            
-            # Mocking the actual processing if libraries fail (safe fallback)
-            try:
-                videoclip = VideoFileClip(video_local)
-                audioclip = AudioFileClip(track_local)
-                
-                # Loop audio or cut audio to fit video
-                if audioclip.duration < videoclip.duration:
-                    final_audio = audioclip
-                else:
-                    final_audio = audioclip.with_end(videoclip.duration)
-                
-                new_clip = videoclip.with_audio(final_audio)
-                new_clip.write_videofile(output_local, codec="libx264", audio_codec="aac")
-                
-                videoclip.close()
-                audioclip.close()
-                new_clip.close()
-                
-                success = True
-            except Exception as e:
-                print(f"Moviepy failed: {e}")
-                # Fallback: Just copy video as result for demo
-                with open(video_local, "rb") as f_in, open(output_local, "wb") as f_out:
-                    f_out.write(f_in.read())
-                success = True # Technially failed editing but we proceed for demo flow
-
-            if success:
-                out_name = f"edit_{edit.id}.mp4"
-                minio_client.upload_file(settings.MINIO_BUCKET_PROCESSED, out_name, output_local, "video/mp4")
-                edit.processed_file_path = out_name
-                
-                # Generate and upload thumbnail
-                thumb_path = generate_thumbnail(output_local)
-                if thumb_path:
-                    thumb_name = f"thumb_{edit.id}.jpg"
-                    minio_client.upload_file(settings.MINIO_BUCKET_PROCESSED, thumb_name, thumb_path, "image/jpeg")
-                    edit.thumbnail_path = thumb_name
-                    try:
-                        os.remove(thumb_path)
-                    except: pass
-                
-                edit.status = EditStatus.completed
-                db.commit()
+                    # EDITING LOGIC: remux the video with the new audio track
+                    # Note: This requires ffmpeg installed in the worker container
+                    if not replace_audio(video_local, track_local, output_local):
+                        # Never publish the untouched source as the montage: a
+                        # non-failed edit is reused by the render cache
+                        print("Audio replacement failed")
+                        edit.status = EditStatus.failed
+                        db.commit()
+                        return
+
+                    out_name = f"edit_{edit.id}.mp4"
+                    minio_client.upload_file(settings.MINIO_BUCKET_PROCESSED, out_name, output_local, "video/mp4")
+                    edit.processed_file_path = out_name
+
+                    # Generate and upload thumbnails + preview sprite
+                    thumbs = generate_thumbnails(output_local, ws.root)
+                    if thumbs:
+                        edit.thumbnail_path, edit.thumbnail_detail_path, edit.sprite_path = upload_thumbnails(
+                            thumbs, settings.MINIO_BUCKET_PROCESSED, str(edit.id)
+                        )
+
+                    edit.status = EditStatus.completed
+                    db.commit()
 
         except Exception as e:
             print(f"Edit failed: {e}")
             edit.status = EditStatus.failed
             db.commit()
-        finally:
-            # Cleanup
-            for p in [video_local, track_local, output_local]:
-                if os.path.exists(p):
-                    try:
-                        os.remove(p)
-                    except:
-                        pass
+    finally:
+        db.close()
+
+@celery_app.task
+def process_motion_result_task(motion_id: str, video_url: str):
+    db = SessionLocal()
+    try:
+        motion = db.query(MotionCache).filter(MotionCache.id == motion_id).first()
+        if not motion:
+            return
+
+        task_id = motion.external_job_id
+        base_url = (settings.CALLBACK_BASE_URL or "").rstrip("/")
+        local_video_url = None
+        motion_thumbnail_url = None
+
+        try:
+            with job_workspace(f"motion-{motion_id}") as ws:
+                temp_dir = ws.root
+                temp_video = ws.path("motion.mp4")
+                try:
+                    # Stream the provider response straight into MinIO, teeing to
+                    # disk only for the thumbnail so the video is never held in RAM
+                    video_filename = f"motion_{task_id}_{uuid.uuid4()}.mp4"
+                    with requests.get(video_url, stream=True, timeout=60) as resp:
+                        resp.raise_for_status()
+                        resp.raw.decode_content = True
+                        with open(temp_video, "wb") as f:
+                            minio_client.put_stream(settings.MINIO_BUCKET_MOTIONS, video_filename, TeeReader(resp.raw, f), "video/mp4")
+                    local_video_url = f"{base_url}{settings.API_V1_STR}/files/{settings.MINIO_BUCKET_MOTIONS}/{video_filename}"
+
+                    info = probe_media(temp_video)
+                    if info:
+                        apply_media_info(motion, info)
+
+                    # Generate thumbnails + preview sprite
+                    thumbs = generate_thumbnails(temp_video, temp_dir, info.duration if info else None)
+                    if thumbs:
+                        names = upload_thumbnails(thumbs, settings.MINIO_BUCKET_MOTIONS, f"motion_{task_id}_{uuid.uuid4()}")
+                        motion_thumbnail_url, motion.motion_thumbnail_detail_url, motion.motion_sprite_url = [
+                            f"{base_url}{settings.API_V1_STR}/files/{settings.MINIO_BUCKET_MOTIONS}/{name}" if name else None
+                            for name in names
+                        ]
+                except Exception as e:
+                    print(f"Failed to process video/thumbnail for motion {task_id}: {e}")
+        except Exception as e:
+            # No scratch space (WorkspaceFullError, mkdtemp errors): fail
+            # instead of leaving the motion processing forever
+            print(f"No workspace for motion {task_id}: {e}")
+            motion.status = JobStatus.FAILED.value
+            motion.error_log = str(e)
+            db.commit()
+            return
+
+        # Update DB record with info (Success)
+        motion.status = JobStatus.SUCCESS.value
+        motion.motion_video_url = local_video_url or video_url # Fallback to external if local fails
+        motion.motion_thumbnail_url = motion_thumbnail_url
+        db.commit()
     finally:
         db.close()
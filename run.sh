@@ -7,7 +7,10 @@ python app/backend_pre_start.py
 alembic revision --autogenerate -m "Schema update"
 
 # Run migrations
-alembic upgrade head
+alembic upgrade head || exit 1
+
+# Data backfills that need the migrated schema
+python app/backend_post_migrate.py
 
 # Start app
 uvicorn app.main:app --host 0.0.0.0 --port 8000 --proxy-headers --forwarded-allow-ips '*' --reload
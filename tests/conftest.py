@@ -0,0 +1,46 @@
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class FixtureServer:
+    """Static HTTP server over a directory, recording the paths it was asked for."""
+
+    def __init__(self, root):
+        self.root = root
+        self.requests = []
+        server = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            extensions_map = {**SimpleHTTPRequestHandler.extensions_map, ".mp4": "video/mp4"}
+
+            def log_message(self, *args):
+                pass
+
+            def send_head(self):
+                server.requests.append((self.command, self.path))
+                return super().send_head()
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(root)))
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}/{name}"
+
+    def add_file(self, name: str, data: bytes) -> str:
+        (self.root / name).write_bytes(data)
+        return self.url(name)
+
+
+@pytest.fixture
+def fixture_server(tmp_path):
+    root = tmp_path / "served"
+    root.mkdir()
+    server = FixtureServer(root)
+    server.thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import backend_post_migrate
+from app.models.video import Video
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    engine = create_engine("sqlite://")
+    Video.__table__.create(engine)
+    # Postgres-only partial index; on SQLite it would cover deleted rows too
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_videos_canonical_url_active"))
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(backend_post_migrate, "SessionLocal", factory)
+    return factory
+
+
+def add_video(db, url, status="downloaded", age=0, canonical_url=None):
+    video = Video(
+        original_url=url,
+        canonical_url=canonical_url,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(minutes=age),
+    )
+    db.add(video)
+    db.commit()
+    return video.id
+
+
+def canonical_of(Session, video_id):
+    db = Session()
+    try:
+        return db.get(Video, video_id).canonical_url
+    finally:
+        db.close()
+
+
+def test_backfill_sets_keys_and_keeps_oldest_live_duplicate(Session):
+    db = Session()
+    old = add_video(db, "https://www.tiktok.com/@user/video/123?lang=en", age=10)
+    dup = add_video(db, "https://m.tiktok.com/v/123.html", age=5)
+    deleted = add_video(db, "https://www.tiktok.com/@user/video/123", status="deleted", age=1)
+    other = add_video(db, "https://www.youtube.com/watch?v=abc", age=1)
+    db.close()
+
+    backend_post_migrate.backfill_canonical_urls()
+
+    assert canonical_of(Session, old) == "tiktok:123"
+    assert canonical_of(Session, dup) == backend_post_migrate.duplicate_marker(dup)
+    assert canonical_of(Session, deleted) == "tiktok:123"
+    assert canonical_of(Session, other) == "youtube:abc"
+
+
+def test_backfill_respects_existing_keys(Session):
+    db = Session()
+    add_video(db, "https://www.tiktok.com/@user/video/123", canonical_url="tiktok:123")
+    legacy = add_video(db, "https://www.tiktok.com/@other/video/123", age=30)
+    db.close()
+
+    backend_post_migrate.backfill_canonical_urls()
+
+    assert canonical_of(Session, legacy) == backend_post_migrate.duplicate_marker(legacy)
+
+
+def test_backfill_converges(Session, monkeypatch):
+    db = Session()
+    add_video(db, "https://www.tiktok.com/@user/video/123", age=10)
+    add_video(db, "https://m.tiktok.com/v/123.html", age=5)
+    db.close()
+    backend_post_migrate.backfill_canonical_urls()
+
+    # Nothing left to resolve on the next start
+    seen = []
+    monkeypatch.setattr(backend_post_migrate, "canonicalize_urls", lambda urls: seen.extend(urls) or {})
+    backend_post_migrate.backfill_canonical_urls()
+
+    assert seen == []
@@ -0,0 +1,126 @@
+import os
+import time
+
+import pytest
+import yt_dlp
+
+from app.core.config import settings
+from app.services.downloader import VideoDownloader
+
+VIDEO_BYTES = os.urandom(64 * 1024)
+
+
+def test_download_writes_served_file(fixture_server, tmp_path):
+    url = fixture_server.add_file("clip.mp4", VIDEO_BYTES)
+    downloader = VideoDownloader()
+
+    path = downloader.download(url, str(tmp_path / "out" / "video.mp4"))
+
+    assert path is not None
+    with open(path, "rb") as f:
+        assert f.read() == VIDEO_BYTES
+    stats = downloader.stats()
+    assert stats["downloads"] == 1
+    assert stats["bytes"] == len(VIDEO_BYTES)
+
+
+def test_repeated_url_reuses_extracted_info(fixture_server, tmp_path):
+    url = fixture_server.add_file("clip.mp4", VIDEO_BYTES)
+    downloader = VideoDownloader()
+
+    downloader.download(url, str(tmp_path / "first" / "video.mp4"))
+    probes = len(fixture_server.requests)
+    downloader.download(url, str(tmp_path / "second" / "video.mp4"))
+
+    stats = downloader.stats()
+    assert stats["info_cache_hits"] == 1
+    assert stats["info_cache_misses"] == 1
+    assert stats["info_cache_hit_ratio"] == 0.5
+    # Only the media itself is fetched again, not the extractor's probe
+    assert len(fixture_server.requests) - probes < probes
+
+
+def test_missing_file_counts_failure(fixture_server, tmp_path):
+    downloader = VideoDownloader()
+    with pytest.raises(yt_dlp.utils.DownloadError):
+        downloader.download(fixture_server.url("missing.mp4"), str(tmp_path / "video.mp4"))
+
+    stats = downloader.stats()
+    assert stats["downloads"] == 0
+    assert stats["failures"] == 1
+
+
+def test_oversized_file_counts_failure(fixture_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "YTDLP_MAX_FILESIZE_MB", 0.01)  # ~10 KB
+    url = fixture_server.add_file("clip.mp4", VIDEO_BYTES)
+    downloader = VideoDownloader()
+
+    assert downloader.download(url, str(tmp_path / "out" / "video.mp4")) is None
+
+    stats = downloader.stats()
+    assert stats["downloads"] == 0
+    assert stats["failures"] == 1
+
+
+def test_info_cache_is_keyed_by_canonical_url():
+    downloader = VideoDownloader()
+    downloader._get_ydl()
+    info = {"id": "123"}
+    downloader._info_cache["tiktok:123"] = (time.monotonic(), info)
+
+    assert downloader.extract_info("https://m.tiktok.com/v/123.html?lang=en") == info
+    assert downloader.stats()["info_cache_hits"] == 1
+
+
+def select(selector, formats):
+    ydl = yt_dlp.YoutubeDL({"quiet": True})
+    ctx = {"formats": formats, "has_merged_format": False, "incomplete_formats": False}
+    return [f["format_id"] for f in ydl.build_format_selector(selector)(ctx)]
+
+
+def make_format(format_id, height, filesize=None, filesize_approx=None):
+    return {
+        "format_id": format_id,
+        "url": f"http://example.invalid/{format_id}.mp4",
+        "ext": "mp4",
+        "vcodec": "h264",
+        "acodec": "aac",
+        "height": height,
+        "filesize": filesize,
+        "filesize_approx": filesize_approx,
+    }
+
+
+def test_format_selector_falls_back_to_rendition_under_size_cap(monkeypatch):
+    monkeypatch.setattr(settings, "YTDLP_MAX_HEIGHT", 1080)
+    monkeypatch.setattr(settings, "YTDLP_MAX_FILESIZE_MB", 10)
+    mb = 1024 * 1024
+    formats = [
+        make_format("360p", 360, filesize=3 * mb),
+        make_format("720p", 720, filesize=8 * mb),
+        make_format("1080p", 1080, filesize=40 * mb),
+        make_format("2160p", 2160, filesize=90 * mb),
+    ]
+
+    assert select(VideoDownloader()._format_selector(), formats) == ["720p"]
+
+
+def test_format_selector_uses_approximate_sizes(monkeypatch):
+    monkeypatch.setattr(settings, "YTDLP_MAX_HEIGHT", 1080)
+    monkeypatch.setattr(settings, "YTDLP_MAX_FILESIZE_MB", 10)
+    mb = 1024 * 1024
+    formats = [
+        make_format("360p", 360, filesize_approx=3 * mb),
+        make_format("720p", 720, filesize_approx=8 * mb),
+        make_format("1080p", 1080, filesize_approx=40 * mb),
+    ]
+
+    assert select(VideoDownloader()._format_selector(), formats) == ["720p"]
+
+
+def test_format_selector_without_sizes_keeps_height_cap(monkeypatch):
+    monkeypatch.setattr(settings, "YTDLP_MAX_HEIGHT", 720)
+    monkeypatch.setattr(settings, "YTDLP_MAX_FILESIZE_MB", 10)
+    formats = [make_format("480p", 480), make_format("720p", 720), make_format("1080p", 1080)]
+
+    assert select(VideoDownloader()._format_selector(), formats) == ["720p"]
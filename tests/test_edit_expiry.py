@@ -0,0 +1,67 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.endpoints.montage import expire_stale_edits
+from app.core.config import settings
+from app.models.edit import Edit, EditStatus
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Edit.__table__.create(engine)
+    # Postgres-only partial index; on SQLite it would be a plain unique index
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_edits_render_key_active"))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_edit(db, render_key, status, age_minutes):
+    edit = Edit(
+        track_id=uuid.uuid4(),
+        status=status,
+        render_key=render_key,
+        created_at=datetime.utcnow() - timedelta(minutes=age_minutes),
+    )
+    db.add(edit)
+    db.commit()
+    return edit.id
+
+
+def status_of(db, edit_id):
+    db.expire_all()
+    return db.get(Edit, edit_id).status
+
+
+def test_stale_inflight_edits_are_failed(db):
+    old = settings.EDIT_INFLIGHT_TTL_MINUTES + 5
+    pending = add_edit(db, "key", EditStatus.pending, old)
+    processing = add_edit(db, "key", EditStatus.processing, old)
+
+    result = db.execute(expire_stale_edits("key"))
+    db.commit()
+
+    assert result.rowcount == 2
+    assert status_of(db, pending) == EditStatus.failed
+    assert status_of(db, processing) == EditStatus.failed
+
+
+def test_recent_completed_and_other_keys_are_kept(db):
+    old = settings.EDIT_INFLIGHT_TTL_MINUTES + 5
+    recent = add_edit(db, "key", EditStatus.processing, 1)
+    completed = add_edit(db, "key", EditStatus.completed, old)
+    other_key = add_edit(db, "other", EditStatus.pending, old)
+
+    result = db.execute(expire_stale_edits("key"))
+    db.commit()
+
+    assert result.rowcount == 0
+    assert status_of(db, recent) == EditStatus.processing
+    assert status_of(db, completed) == EditStatus.completed
+    assert status_of(db, other_key) == EditStatus.pending
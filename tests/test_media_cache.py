@@ -0,0 +1,66 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import media_cache as media_cache_module
+from app.services.media_cache import LOCK_SUFFIX, MediaCache
+
+
+class FakeStorage:
+    def __init__(self, objects):
+        self.objects = objects
+        self.downloads = 0
+
+    def stat_object(self, bucket_name, object_name):
+        data = self.objects[object_name]
+        return SimpleNamespace(etag=str(hash(data)), size=len(data))
+
+    def download_file(self, bucket_name, object_name, file_path):
+        self.downloads += 1
+        with open(file_path, "wb") as f:
+            f.write(self.objects[object_name])
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    fake = FakeStorage({"a.mp4": b"a" * 100, "b.mp4": b"b" * 100, "c.mp4": b"c" * 100})
+    monkeypatch.setattr(media_cache_module, "minio_client", fake)
+    return fake
+
+
+def test_second_fetch_is_a_hit(storage, tmp_path):
+    cache = MediaCache(str(tmp_path), max_bytes=10_000)
+
+    with cache.fetch("bucket", "a.mp4") as path:
+        assert open(path, "rb").read() == b"a" * 100
+    with cache.fetch("bucket", "a.mp4") as again:
+        assert again == path
+
+    assert storage.downloads == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_eviction_removes_entries_and_lock_files(storage, tmp_path):
+    cache = MediaCache(str(tmp_path), max_bytes=150)
+
+    for name in ("a.mp4", "b.mp4", "c.mp4"):
+        with cache.fetch("bucket", name):
+            pass
+
+    entries = [n for n in os.listdir(tmp_path) if not n.endswith(LOCK_SUFFIX)]
+    locks = [n for n in os.listdir(tmp_path) if n.endswith(LOCK_SUFFIX)]
+    assert len(entries) == 1
+    assert sorted(n[:-len(LOCK_SUFFIX)] for n in locks) == sorted(entries)
+
+
+def test_entry_in_use_is_not_evicted(storage, tmp_path):
+    cache = MediaCache(str(tmp_path), max_bytes=150)
+
+    with cache.fetch("bucket", "a.mp4") as held:
+        with cache.fetch("bucket", "b.mp4"):
+            pass
+        with cache.fetch("bucket", "c.mp4"):
+            pass
+        assert os.path.exists(held)
@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.motion_cache import MotionCache
+from app.schemas.motion_cache import JobStatus
+from app.services.motion_service import expire_stale_motions
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    MotionCache.__table__.create(engine)
+    # Postgres-only partial index; on SQLite it would be a plain unique index
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_motion_cache_inflight"))
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_motion(db, avatar_id, reference_id, status, age_minutes):
+    motion = MotionCache(
+        avatar_id=avatar_id,
+        reference_id=reference_id,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(minutes=age_minutes),
+    )
+    db.add(motion)
+    db.commit()
+    return motion.id
+
+
+def status_of(db, motion_id):
+    db.expire_all()
+    return db.get(MotionCache, motion_id).status
+
+
+def test_stale_inflight_motions_are_failed(db):
+    avatar_id, reference_id = uuid.uuid4(), uuid.uuid4()
+    old = settings.MOTION_INFLIGHT_TTL_MINUTES + 5
+    pending = add_motion(db, avatar_id, reference_id, JobStatus.PENDING.value, old)
+    processing = add_motion(db, avatar_id, reference_id, JobStatus.PROCESSING.value, old)
+
+    result = db.execute(expire_stale_motions(avatar_id, reference_id))
+    db.commit()
+
+    assert result.rowcount == 2
+    assert status_of(db, pending) == JobStatus.FAILED.value
+    assert status_of(db, processing) == JobStatus.FAILED.value
+
+
+def test_recent_finished_and_other_pairs_are_kept(db):
+    avatar_id, reference_id = uuid.uuid4(), uuid.uuid4()
+    old = settings.MOTION_INFLIGHT_TTL_MINUTES + 5
+    recent = add_motion(db, avatar_id, reference_id, JobStatus.PROCESSING.value, 1)
+    finished = add_motion(db, avatar_id, reference_id, JobStatus.SUCCESS.value, old)
+    other_pair = add_motion(db, uuid.uuid4(), reference_id, JobStatus.PENDING.value, old)
+
+    result = db.execute(expire_stale_motions(avatar_id, reference_id))
+    db.commit()
+
+    assert result.rowcount == 0
+    assert status_of(db, recent) == JobStatus.PROCESSING.value
+    assert status_of(db, finished) == JobStatus.SUCCESS.value
+    assert status_of(db, other_pair) == JobStatus.PENDING.value
@@ -0,0 +1,56 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app import backend_pre_start
+from app.models.motion_cache import MotionCache
+
+
+@pytest.fixture
+def Session(monkeypatch):
+    engine = create_engine("sqlite://")
+    MotionCache.__table__.create(engine)
+    # The index being prepared for doesn't exist yet when the step runs
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_motion_cache_inflight"))
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(backend_pre_start, "SessionLocal", factory)
+    monkeypatch.setattr(backend_pre_start, "table_exists", lambda db, table: True)
+    return factory
+
+
+def add_motion(db, avatar_id, reference_id, status, age_minutes):
+    motion = MotionCache(
+        avatar_id=avatar_id,
+        reference_id=reference_id,
+        status=status,
+        created_at=datetime.utcnow() - timedelta(minutes=age_minutes),
+    )
+    db.add(motion)
+    db.commit()
+    return motion.id
+
+
+def test_keeps_newest_inflight_motion_per_pair(Session):
+    db = Session()
+    avatar_id, reference_id = uuid.uuid4(), uuid.uuid4()
+    oldest = add_motion(db, avatar_id, reference_id, "pending", 30)
+    older = add_motion(db, avatar_id, reference_id, "processing", 20)
+    newest = add_motion(db, avatar_id, reference_id, "processing", 10)
+    done = add_motion(db, avatar_id, reference_id, "success", 5)
+    other_pair = add_motion(db, uuid.uuid4(), reference_id, "pending", 40)
+    db.close()
+
+    backend_pre_start.dedupe_inflight_motions()
+
+    db = Session()
+    statuses = {m.id: m.status for m in db.query(MotionCache)}
+    db.close()
+    assert statuses[oldest] == "failed"
+    assert statuses[older] == "failed"
+    assert statuses[newest] == "processing"
+    assert statuses[done] == "success"
+    assert statuses[other_pair] == "pending"
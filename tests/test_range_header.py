@@ -0,0 +1,23 @@
+from app.api.v1.endpoints.files import MAX_RANGES, parse_range_header
+
+
+def test_single_and_suffix_ranges():
+    assert parse_range_header("bytes=0-99", 1000) == [(0, 99)]
+    assert parse_range_header("bytes=-100", 1000) == [(900, 999)]
+    assert parse_range_header("bytes=900-", 1000) == [(900, 999)]
+
+
+def test_unsatisfiable_and_malformed():
+    assert parse_range_header("bytes=2000-", 1000) == []
+    assert parse_range_header("bytes=abc", 1000) is None
+    assert parse_range_header(None, 1000) is None
+
+
+def test_overlapping_and_adjacent_ranges_are_merged():
+    assert parse_range_header("bytes=500-,0-99,50-150,151-200", 1000) == [(0, 200), (500, 999)]
+    assert parse_range_header("bytes=0-10,0-10,0-10", 1000) == [(0, 10)]
+
+
+def test_too_many_ranges_serve_full_body():
+    header = "bytes=" + ",".join(f"{i}-{i}" for i in range(MAX_RANGES + 1))
+    assert parse_range_header(header, 1000) is None
@@ -0,0 +1,29 @@
+import time
+
+from app.services import url_canonical
+from app.services.url_canonical import canonicalize_urls
+
+
+def test_short_links_are_resolved(monkeypatch):
+    monkeypatch.setattr(url_canonical, "resolve_short_link", lambda url: "https://www.tiktok.com/@user/video/123")
+
+    canonical = canonicalize_urls(["https://vm.tiktok.com/ZMabc/", "https://www.youtube.com/watch?v=abc"])
+
+    assert canonical == {
+        "https://vm.tiktok.com/ZMabc/": "tiktok:123",
+        "https://www.youtube.com/watch?v=abc": "youtube:abc",
+    }
+
+
+def test_resolution_budget_caps_total_time(monkeypatch):
+    def slow(url):
+        time.sleep(2)
+        return "https://www.tiktok.com/@user/video/123"
+
+    monkeypatch.setattr(url_canonical, "resolve_short_link", slow)
+
+    started = time.monotonic()
+    canonical = canonicalize_urls(["https://vm.tiktok.com/ZMabc/"], budget=0.1)
+
+    assert time.monotonic() - started < 1
+    assert canonical == {"https://vm.tiktok.com/ZMabc/": "https://vm.tiktok.com/ZMabc"}